@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from synthetic_bd_foret import write_synthetic_dataset
+from run_benchmarks import run_isolated
+
+# Grille de profils essayés (produit cartésien)
+DEFAULT_GRID = {
+    'cache_max_mb': [64, 512, 2048],
+    'num_threads': ['1', 'ALL_CPUS'],
+    'compress': ['NONE', 'DEFLATE', 'ZSTD'],
+    'block_size': [256, 512],
+}
+
+
+def _measure_profile(settings, formation, emprise, work_dir):
+    """
+    Construit le masque forêt avec un profil donné, dans un processus dédié
+    (le cache GDAL est global au processus).
+    """
+    from my_function import ExecutionProfile, set_execution_profile
+    from build_mask import build_forest_mask
+
+    set_execution_profile(ExecutionProfile(**settings))
+    output_mask = os.path.join(work_dir, f"mask_{os.getpid()}.tif")
+    start = time.perf_counter()
+    build_forest_mask(formation, emprise, output_mask)
+    wall = time.perf_counter() - start
+    size_mb = os.path.getsize(output_mask) / (1024 * 1024)
+    os.remove(output_mask)
+    return {'wall_s': wall, 'size_mb': size_mb}
+
+
+def benchmark_profiles(formation, emprise, grid=DEFAULT_GRID, repeat=3, timeout=None):
+    """
+    Mesure chaque profil (meilleur temps sur repeat essais) et renvoie les résultats
+    triés ; un profil dont aucun essai n'aboutit est classé en dernier avec son échec.
+    """
+    names = list(grid)
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for values in itertools.product(*(grid[name] for name in names)):
+            settings = dict(zip(names, values))
+            runs = [
+                run_isolated(_measure_profile, (settings, formation, emprise, work_dir), timeout)
+                for _ in range(repeat)
+            ]
+            succeeded = [run for run in runs if run['status'] == 'ok']
+            if not succeeded:
+                results.append({**settings, **runs[-1]})
+                print(f"❌ {settings} : échec ({runs[-1]['status']}, code {runs[-1]['exitcode']})")
+                continue
+            best = min(succeeded, key=lambda run: run['wall_s'])
+            results.append({**settings, **best, 'failed_runs': len(runs) - len(succeeded)})
+            print(f"⏱️ {settings} : {best['wall_s']:.3f} s, {best['size_mb']:.1f} Mo")
+    # Le plus rapide d'abord ; à temps égal (±5 %), le plus compact ; les échecs à la fin
+    succeeded = [r for r in results if r['status'] == 'ok']
+    failed = [r for r in results if r['status'] != 'ok']
+    if not succeeded:
+        return failed
+    fastest = min(r['wall_s'] for r in succeeded)
+    return sorted(succeeded, key=lambda r: (r['wall_s'] > fastest * 1.05, r['size_mb'], r['wall_s'])) + failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Choisit un profil d'exécution GDAL pour l'hôte courant.")
+    parser.add_argument("-n", "--features", type=int, default=100_000, help="Taille du jeu synthétique")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "td3_bench_data"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=None, help="Durée maximale d'un essai en secondes")
+    parser.add_argument("--output", default="gdal_profile_results.json")
+    args = parser.parse_args()
+
+    size_dir = os.path.join(args.data_dir, f"n{args.features}")
+    formation = os.path.join(size_dir, 'FORMATION_VEGETALE.gpkg')
+    emprise = os.path.join(size_dir, 'emprise_etude.gpkg')
+    if not (os.path.exists(formation) and os.path.exists(emprise)):
+        formation, emprise = write_synthetic_dataset(size_dir, args.features)
+
+    results = benchmark_profiles(formation, emprise, repeat=args.repeat, timeout=args.timeout)
+    with open(args.output, 'w') as f:
+        json.dump({'cpu_count': os.cpu_count(), 'n_features': args.features, 'results': results}, f, indent=2)
+
+    print(f"💾 Résultats sauvegardés : {args.output}")
+    if results[0]['status'] != 'ok':
+        print("❌ Aucun profil n'a abouti.")
+        sys.exit(1)
+    best = {name: results[0][name] for name in DEFAULT_GRID}
+    print(f"✅ Profil recommandé (section [gdal]) : {best}")
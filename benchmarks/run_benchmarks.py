@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import traceback
+import multiprocessing
+from queue import Empty
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from synthetic_bd_foret import write_synthetic_dataset
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_THRESHOLD = 0.2
+
+
+# Chaque étape : préparation (non chronométrée) puis exécution chronométrée
+
+def setup_mask(paths):
+    return paths
+
+def run_mask(paths):
+    from build_mask import build_forest_mask
+    build_forest_mask(paths['formation'], paths['emprise'], os.path.join(paths['work_dir'], 'masque_foret.tif'))
+
+def setup_intersect(paths):
+    import geopandas as gpd
+    return gpd.read_file(paths['formation']), gpd.read_file(paths['emprise'])
+
+def run_intersect(data):
+    gdf, gdf_emprise = data
+    return gdf[gdf.intersects(gdf_emprise.union_all())].copy()
+
+def setup_clip(paths):
+    gdf, gdf_emprise = setup_intersect(paths)
+    return run_intersect((gdf, gdf_emprise)), gdf_emprise, paths['n_workers']
+
+def run_clip(data):
+    from my_function import clip_to_extent
+    gdf, gdf_emprise, n_workers = data
+    return clip_to_extent(gdf, gdf_emprise, n_workers=n_workers)
+
+def setup_mapping(paths):
+    return run_clip(setup_clip(paths))
+
+def run_mapping(gdf):
+    from sample_curation import add_class_fields
+    return add_class_fields(gdf)
+
+def setup_plots(paths):
+    from sample_analysis_nb_sample import add_nb_pix, prepare_analysis_sample
+    return prepare_analysis_sample(add_nb_pix(run_mapping(setup_mapping(paths)))), paths['work_dir']
+
+def run_plot_polygons(data):
+    from my_function import plot_bar_polygons_per_class
+    gdf, work_dir = data
+    plot_bar_polygons_per_class(gdf, os.path.join(work_dir, 'nb_poly.png'))
+
+def run_plot_pixels(data):
+    from my_function import plot_bar_pixels_per_class
+    gdf, work_dir = data
+    plot_bar_pixels_per_class(gdf, os.path.join(work_dir, 'nb_pix.png'))
+
+def run_plot_violin(data):
+    from my_function import plot_violin_pixels_per_polygon_by_class
+    gdf, work_dir = data
+    plot_violin_pixels_per_polygon_by_class(gdf, os.path.join(work_dir, 'violin.png'))
+
+
+STAGES = {
+    'build_forest_mask': (setup_mask, run_mask),
+    'curation_intersect': (setup_intersect, run_intersect),
+    'curation_clip': (setup_clip, run_clip),
+    'curation_mapping': (setup_mapping, run_mapping),
+    'plot_bar_polygons': (setup_plots, run_plot_polygons),
+    'plot_bar_pixels': (setup_plots, run_plot_pixels),
+    'plot_violin': (setup_plots, run_plot_violin),
+}
+
+
+def _peak_rss_mb():
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _proc_status_mb(field):
+    # Valeurs VmRSS / VmHWM de /proc/self/status (en Ko)
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def _reset_peak_rss():
+    """
+    Remet la mémoire de pointe (VmHWM) du processus à sa mémoire courante
+    (Linux >= 4.0) ; renvoie False si ce n'est pas possible.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _measure_stage(stage, paths):
+    """
+    Exécute une étape dans un processus dédié pour isoler sa mémoire de pointe.
+    stage_rss_mb est la hausse de mémoire due à l'étape elle-même : pic mesuré
+    pendant run (pic remis à zéro après la préparation) moins la mémoire au
+    départ. Sans /proc (macOS), c'est la hausse du pic du processus, qui ignore
+    un pic d'étape inférieur à celui de la préparation.
+    """
+    setup, run = STAGES[stage]
+    data = setup(paths)
+    exact = _reset_peak_rss()
+    rss_before = _proc_status_mb('VmRSS') if exact else _peak_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    run(data)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    stage_peak = _proc_status_mb('VmHWM') if exact else _peak_rss_mb()
+    return {
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'stage_rss_mb': max(0.0, stage_peak - rss_before),
+        'stage_rss_exact': exact,
+        'rss_before_mb': rss_before,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _run_child(target, args, queue):
+    try:
+        queue.put({'status': 'ok', **target(*args)})
+    except Exception:
+        queue.put({'status': 'error', 'error': traceback.format_exc()})
+
+
+def run_isolated(target, args, timeout=None, poll_s=1.0):
+    """
+    Exécute target(*args) (qui renvoie un dict) dans un processus « spawn » et
+    renvoie son résultat avec status='ok'. Une exception, la mort du processus
+    (ex. OOM killer) ou un dépassement de timeout (secondes) donnent un
+    résultat status='error' / 'killed' / 'timeout' au lieu de bloquer.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_child, args=(target, args, queue))
+    process.start()
+    start = time.monotonic()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=poll_s)
+        except Empty:
+            if not process.is_alive():
+                # Le résultat a pu être envoyé juste avant la fin du processus
+                try:
+                    result = queue.get(timeout=poll_s)
+                except Empty:
+                    result = {'status': 'killed'}
+            elif timeout is not None and time.monotonic() - start > timeout:
+                process.terminate()
+                result = {'status': 'timeout'}
+    process.join()
+    if result['status'] != 'ok':
+        result['exitcode'] = process.exitcode
+    return result
+
+
+def measure_stage(stage, paths, timeout=None):
+    return run_isolated(_measure_stage, (stage, paths), timeout)
+
+
+def run_benchmarks(sizes, stages, data_dir, n_workers=1, seed=0, timeout=None):
+    """
+    Mesure le temps et la mémoire de chaque étape pour chaque taille ; un essai
+    en échec (exception, processus tué, timeout) est enregistré comme tel.
+    """
+    results = []
+    for n in sizes:
+        size_dir = os.path.join(data_dir, f"n{n}")
+        formation = os.path.join(size_dir, 'FORMATION_VEGETALE.gpkg')
+        emprise = os.path.join(size_dir, 'emprise_etude.gpkg')
+        if not (os.path.exists(formation) and os.path.exists(emprise)):
+            formation, emprise = write_synthetic_dataset(size_dir, n, seed)
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            paths = {'formation': formation, 'emprise': emprise, 'work_dir': work_dir, 'n_workers': n_workers}
+            for stage in stages:
+                record = {'stage': stage, 'n_features': n, **measure_stage(stage, paths, timeout)}
+                if record['status'] == 'ok':
+                    print(f"⏱️ {stage} (n={n}) : {record['wall_s']:.3f} s, +{record['stage_rss_mb']:.0f} Mo")
+                else:
+                    print(f"❌ {stage} (n={n}) : échec ({record['status']}, code {record['exitcode']})")
+                results.append(record)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Renvoie les mesures dépassant la référence de plus de threshold (temps ou
+    hausse de mémoire de l'étape), et les essais en échec réussis dans la référence.
+    """
+    reference = {(r['stage'], r['n_features']): r for r in baseline['results']}
+    regressions = []
+    for record in results:
+        ref = reference.get((record['stage'], record['n_features']))
+        if ref is None or ref.get('status', 'ok') != 'ok':
+            continue
+        if record['status'] != 'ok':
+            regressions.append({
+                'stage': record['stage'], 'n_features': record['n_features'], 'metric': 'status',
+                'baseline': 'ok', 'current': record['status'],
+            })
+            continue
+        for metric in ('wall_s', 'stage_rss_mb'):
+            if metric not in ref:
+                continue
+            if ref[metric] > 0 and record[metric] > ref[metric] * (1 + threshold):
+                regressions.append({
+                    'stage': record['stage'], 'n_features': record['n_features'], 'metric': metric,
+                    'baseline': ref[metric], 'current': record[metric],
+                    'ratio': record[metric] / ref[metric],
+                })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de montée en charge des étapes du pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Nombres d'entités (10³ à 10⁷)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "td3_bench_data"),
+                        help="Dossier des jeux synthétiques (réutilisés d'un lancement à l'autre)")
+    parser.add_argument("--workers", type=int, default=1, help="Threads pour clip_to_extent")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Durée maximale d'une étape en secondes (sinon illimitée)")
+    parser.add_argument("--output", default="bench_results.json", help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", default=None, help="Fichier JSON de référence")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Dégradation relative tolérée (0.2 = +20 %%)")
+    args = parser.parse_args()
+
+    from osgeo import gdal
+    results = run_benchmarks(args.sizes, args.stages, args.data_dir, args.workers, timeout=args.timeout)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'gdal': gdal.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'results': results,
+        }, f, indent=2)
+    print(f"💾 Résultats sauvegardés : {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.threshold)
+        for r in regressions:
+            if r['metric'] == 'status':
+                print(f"❌ Régression {r['stage']} (n={r['n_features']}) : essai en échec ({r['current']})")
+            else:
+                print(f"❌ Régression {r['stage']} (n={r['n_features']}) {r['metric']} : "
+                      f"{r['baseline']:.3f} → {r['current']:.3f} (x{r['ratio']:.2f})")
+        if regressions:
+            sys.exit(1)
+        print("✅ Aucune régression par rapport à la référence.")
+
+    if any(r['status'] != 'ok' for r in results):
+        sys.exit(1)
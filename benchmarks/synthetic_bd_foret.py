@@ -0,0 +1,139 @@
+import os
+import argparse
+import numpy as np
+import geopandas as gpd
+import shapely
+from shapely import GeometryType
+
+# Emprise de type tuile Sentinel-2 (T31TCJ) en Lambert-93
+DEFAULT_EXTENT = (520000.0, 6240000.0, 630000.0, 6350000.0)
+CRS = "EPSG:2154"
+
+# CODE_TFV -> (TFV, poids relatif) : répartition proche de la BD Forêt V2
+# en Occitanie, avec les classes non forestières exclues par filter_forest_layer
+TFV_DISTRIBUTION = {
+    'FF1-49-49': ('Forêt fermée d’un autre feuillu pur', 4),
+    'FF1-09-09': ('Forêt fermée de hêtre pur', 2),
+    'FF1-10-10': ('Forêt fermée de châtaignier pur', 3),
+    'FF1G01-01': ('Forêt fermée de chênes décidus purs', 22),
+    'FF1-14-14': ('Forêt fermée de robinier pur', 2),
+    'FP': ('Peupleraie', 3),
+    'FF1-00-00': ('Forêt fermée à mélange de feuillus', 18),
+    'FF1-00': ('Forêt fermée de feuillus purs en îlots', 6),
+    'FF2G61-61': ('Forêt fermée de sapin ou épicéa', 1),
+    'FF2-91-91': ('Forêt fermée à mélange d’autres conifères', 1),
+    'FF2-90-90': ('Forêt fermée d’un autre conifère pur autre que pin', 1),
+    'FF2-63-63': ('Forêt fermée de mélèze pur', 0.5),
+    'FF2-52-52': ('Forêt fermée de pin sylvestre pur', 2),
+    'FF2-80-80': ('Forêt fermée à mélange de pins purs', 1),
+    'FF2-81-81': ('Forêt fermée d’un autre pin pur', 0.5),
+    'FF2-64-64': ('Forêt fermée de douglas pur', 2),
+    'FF2G53-53': ('Forêt fermée de pin laricio ou pin noir pur', 1.5),
+    'FF2-51-51': ('Forêt fermée de pin maritime pur', 2),
+    'FF2-00-00': ('Forêt fermée à mélange de conifères', 1.5),
+    'FF2-00': ('Forêt fermée de conifères purs en îlots', 1),
+    'FF32': ('Forêt fermée à mélange de conifères prépondérants et feuillus', 2),
+    'FF31': ('Forêt fermée à mélange de feuillus prépondérants et conifères', 4),
+    'FF0': ('Forêt fermée sans couvert arboré', 1),
+    'FO0': ('Forêt ouverte sans couvert arboré', 1),
+    'LA4': ('Formation herbacée', 6),
+    'LA6': ('Lande', 10),
+}
+
+
+def generate_polygons(n, rng, extent=DEFAULT_EXTENT, median_radius=80.0, median_vertices=30):
+    """
+    Génère n polygones étoilés (toujours valides) : rayons et nombres de sommets
+    log-normaux, comme les îlots de la BD Forêt.
+    """
+    xmin, ymin, xmax, ymax = extent
+    centers_x = rng.uniform(xmin, xmax, n)
+    centers_y = rng.uniform(ymin, ymax, n)
+    radius = median_radius * rng.lognormal(0.0, 0.8, n)
+    n_vertices = np.clip(np.round(median_vertices * rng.lognormal(0.0, 0.7, n)), 4, 2000).astype(np.int64)
+
+    # Angles strictement croissants sur [0, 2π) pour chaque polygone
+    total = int(n_vertices.sum())
+    group = np.repeat(np.arange(n), n_vertices)
+    starts = np.concatenate(([0], np.cumsum(n_vertices)[:-1]))
+    steps = rng.uniform(0.5, 1.5, total)
+    cumulative = np.cumsum(steps)
+    offset = np.concatenate(([0.0], cumulative))[starts]
+    group_sum = np.add.reduceat(steps, starts)
+    angles = (cumulative - offset[group] - steps) / group_sum[group] * 2 * np.pi
+    radii = radius[group] * rng.uniform(0.6, 1.0, total)
+
+    x = centers_x[group] + radii * np.cos(angles)
+    y = centers_y[group] + radii * np.sin(angles)
+
+    # Fermeture des anneaux : insertion du premier sommet en fin de chaque polygone
+    ends = np.cumsum(n_vertices)
+    x = np.insert(x, ends, x[starts])
+    y = np.insert(y, ends, y[starts])
+    ring_offsets = np.concatenate(([0], np.cumsum(n_vertices + 1)))
+    geom_offsets = np.arange(n + 1)
+
+    return shapely.from_ragged_array(
+        GeometryType.POLYGON, np.column_stack([x, y]), (ring_offsets, geom_offsets)
+    )
+
+
+def generate_formation(n, seed=0, extent=DEFAULT_EXTENT, chunk_size=1_000_000):
+    """
+    Génère une couche de type FORMATION_VEGETALE par blocs de chunk_size entités.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array(list(TFV_DISTRIBUTION))
+    labels = np.array([TFV_DISTRIBUTION[code][0] for code in codes])
+    weights = np.array([TFV_DISTRIBUTION[code][1] for code in codes], dtype=float)
+    weights /= weights.sum()
+
+    for start in range(0, n, chunk_size):
+        size = min(chunk_size, n - start)
+        picks = rng.choice(len(codes), size=size, p=weights)
+        yield gpd.GeoDataFrame({
+            'ID': np.arange(start, start + size),
+            'CODE_TFV': codes[picks],
+            'TFV': labels[picks],
+        }, geometry=generate_polygons(size, rng, extent), crs=CRS)
+
+
+def generate_emprise(extent=DEFAULT_EXTENT, margin=0.2):
+    """
+    Génère une emprise d'étude couvrant le centre de l'étendue synthétique.
+    """
+    xmin, ymin, xmax, ymax = extent
+    dx, dy = (xmax - xmin) * margin, (ymax - ymin) * margin
+    return gpd.GeoDataFrame(
+        {'ID': [1]}, geometry=[shapely.box(xmin + dx, ymin + dy, xmax - dx, ymax - dy)], crs=CRS
+    )
+
+
+def write_synthetic_dataset(output_dir, n, seed=0, file_format='gpkg'):
+    """
+    Écrit FORMATION_VEGETALE et emprise_etude synthétiques ; renvoie leurs chemins.
+    Le GeoPackage est utilisé par défaut : un shapefile dépasse 2 Go vers 10⁷ entités.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    extension = 'shp' if file_format == 'shp' else 'gpkg'
+    driver = 'ESRI Shapefile' if file_format == 'shp' else 'GPKG'
+    formation_path = os.path.join(output_dir, f"FORMATION_VEGETALE.{extension}")
+    emprise_path = os.path.join(output_dir, f"emprise_etude.{extension}")
+
+    for i, chunk in enumerate(generate_formation(n, seed)):
+        chunk.to_file(formation_path, driver=driver, mode='w' if i == 0 else 'a')
+    generate_emprise().to_file(emprise_path, driver=driver)
+
+    print(f"💾 Jeu synthétique écrit : {formation_path} ({n} entités)")
+    return formation_path, emprise_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère une BD Forêt synthétique et son emprise.")
+    parser.add_argument("output_dir", help="Dossier de sortie")
+    parser.add_argument("-n", "--features", type=int, default=10_000, help="Nombre d'entités (10³ à 10⁷)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=['gpkg', 'shp'], default='gpkg')
+    args = parser.parse_args()
+
+    write_synthetic_dataset(args.output_dir, args.features, args.seed, args.format)
@@ -0,0 +1,137 @@
+import os
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import geopandas as gpd
+import pandas as pd
+from osgeo import gdal
+from my_function import (
+    validate_and_create_directory,
+    open_shapefile,
+    filter_forest_layer,
+    get_layer_geometry,
+    select_partitions,
+    load_store_index,
+    write_vsimem_layer,
+    ensure_repaired_layer,
+    STORE_LAYER_NAME
+)
+from build_mask import rasterize_forest_mask
+from sample_curation import curate_sample
+
+# ✅ Chemins des fichiers
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+formation_shp = os.path.join(BASE_DIR, "data", "project", "FORMATION_VEGETALE.shp")
+repaired_gpkg = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_repaired.gpkg")
+store_dir = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_store")
+mask_dir = os.path.join(BASE_DIR, "results", "data", "img_pretraitees")
+sample_dir = os.path.join(BASE_DIR, "results", "data", "sample")
+
+# BD Forêt partagée avec les processus de travail (héritée par fork, sans copie)
+_FORMATION = None
+
+
+def load_formation_for_tiles(footprints, source, repaired_cache=repaired_gpkg):
+    """
+    Lit une seule fois la BD Forêt sur l'ensemble des tuiles et construit son index spatial.
+    Avec un stock partitionné, seules les partitions touchant au moins une tuile sont lues ;
+    sinon la couche réparée (repaired_cache) est lue à la place du shapefile brut.
+    """
+    if os.path.isdir(source):
+        index = load_store_index(source)
+        tiles = footprints.to_crs(index['crs']) if index['crs'] else footprints
+        paths = []
+        for bounds in tiles.geometry.bounds.itertuples(index=False):
+            for path in select_partitions(source, tuple(bounds)):
+                if path not in paths:
+                    paths.append(path)
+        gdf = pd.concat(
+            [gpd.read_file(path, layer=STORE_LAYER_NAME) for path in paths],
+            ignore_index=True
+        )
+    else:
+        gdf = gpd.read_file(ensure_repaired_layer(source, repaired_cache), mask=footprints)
+
+    if gdf.crs != footprints.crs:
+        gdf = gdf.to_crs(footprints.crs)
+    gdf.sindex  # index construit avant le fork
+    print(f"✅ BD Forêt chargée une fois : {len(gdf)} polygones pour {len(footprints)} tuiles.")
+    return gdf
+
+
+def process_tile(tile_id, tile_gdf, output_mask, output_sample):
+    """
+    Construit le masque forêt et l'échantillon curé d'une tuile à partir de la BD Forêt partagée.
+    """
+    tile_geom = tile_gdf.geometry.iloc[0]
+    subset = _FORMATION.iloc[_FORMATION.sindex.query(tile_geom, predicate='intersects')]
+
+    # ✅ Échantillon curé
+    sample = curate_sample(subset, tile_gdf)
+    sample.to_file(output_sample, driver='ESRI Shapefile')
+
+    # ✅ Masque forêt (couches intermédiaires en mémoire)
+    formation_path = write_vsimem_layer(subset, 'formation')
+    emprise_path = write_vsimem_layer(tile_gdf, 'emprise')
+    try:
+        formation_ds = open_shapefile(formation_path)
+        emprise_ds = open_shapefile(emprise_path)
+        emprise_layer = emprise_ds.GetLayer()
+        formation_layer = filter_forest_layer(
+            formation_ds.GetLayer(), spatial_filter=get_layer_geometry(emprise_layer)
+        )
+        rasterize_forest_mask(formation_layer, emprise_layer, output_mask)
+        formation_ds = emprise_ds = None
+    finally:
+        gdal.Unlink(formation_path)
+        gdal.Unlink(emprise_path)
+
+    return tile_id, len(subset), len(sample)
+
+
+def run_batch(footprints_path, id_field, source, n_processes=None, repaired_cache=repaired_gpkg):
+    """
+    Traite une liste de tuiles Sentinel-2 en ne lisant la BD Forêt qu'une seule fois.
+    """
+    global _FORMATION
+    validate_and_create_directory(mask_dir)
+    validate_and_create_directory(sample_dir)
+
+    footprints = gpd.read_file(footprints_path)
+    if footprints.crs is None or not footprints.crs.is_projected:
+        raise ValueError("Le CRS des emprises de tuiles doit être projeté (en mètres).")
+    _FORMATION = load_formation_for_tiles(footprints, source, repaired_cache)
+
+    # Le contexte fork permet aux processus d'hériter de la BD Forêt et de son index
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=n_processes, mp_context=context) as executor:
+        futures = []
+        for i in range(len(footprints)):
+            tile_gdf = footprints.iloc[[i]]
+            tile_id = str(tile_gdf[id_field].iloc[0])
+            futures.append(executor.submit(
+                process_tile, tile_id, tile_gdf,
+                os.path.join(mask_dir, f"masque_foret_{tile_id}.tif"),
+                os.path.join(sample_dir, f"Sample_BD_foret_{tile_id}.shp")
+            ))
+        for future in as_completed(futures):
+            tile_id, n_source, n_sample = future.result()
+            print(f"✅ Tuile {tile_id} : {n_source} polygones intersectés, {n_sample} polygones échantillonnés.")
+
+    print(f"🎯 Traitement par lot terminé ({len(footprints)} tuiles).")
+
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Masques forêt et échantillons pour plusieurs tuiles Sentinel-2.")
+    parser.add_argument("footprints", help="Fichier vectoriel des emprises de tuiles (un polygone par tuile)")
+    parser.add_argument("--id-field", default="Name", help="Champ contenant l'identifiant de tuile (ex. T31TCJ)")
+    parser.add_argument("--source", default=None,
+                        help="Stock partitionné ou shapefile BD Forêt (par défaut : stock s'il existe)")
+    parser.add_argument("--processes", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--repaired-cache", default=repaired_gpkg,
+                        help="Couche réparée mise en cache (source shapefile uniquement)")
+    args = parser.parse_args()
+
+    source = args.source or (store_dir if os.path.isdir(store_dir) else formation_shp)
+    run_batch(args.footprints, args.id_field, source, args.processes, args.repaired_cache)
@@ -2,23 +2,31 @@ import os
 from my_function import (
     validate_and_create_directory,
     open_shapefile,
+    ensure_repaired_layer,
     filter_forest_layer,
+    get_layer_geometry,
+    ensure_spatial_index,
     create_raster_from_shapefile,
     rasterize_layer
 )
+from instrumentation import get_tracer
 
-def build_forest_mask(formation_shp, emprise_shp, output_mask):
+def build_forest_mask(formation_shp, emprise_shp, output_mask, repaired_cache=None,
+                      excluded_classes=None, included_classes=None):
     """
     Crée un masque raster pour les zones de forêt.
+    formation_shp peut être un shapefile ou un stock partitionné (ingest_bd_foret.py).
+    Si repaired_cache est fourni, la couche réparée (mise en cache) est utilisée.
+    Seules les entités intersectant l'emprise sont lues (filtre spatial OGR).
     """
     # ✅ Valider et créer le dossier de sortie
     output_dir = os.path.dirname(output_mask)
     validate_and_create_directory(output_dir)
-    
-    # ✅ Ouvrir le shapefile Formation_vegetale et filtrer
-    formation_ds = open_shapefile(formation_shp)
-    formation_layer = formation_ds.GetLayer()
-    formation_layer = filter_forest_layer(formation_layer)
+
+    # ✅ Partir de géométries valides
+    formation_path = formation_shp
+    if repaired_cache is not None and not os.path.isdir(formation_shp):
+        formation_path = ensure_repaired_layer(formation_shp, repaired_cache)
     
     # ✅ Ouvrir le shapefile emprise_etude
     emprise_ds = open_shapefile(emprise_shp)
@@ -28,11 +36,31 @@ def build_forest_mask(formation_shp, emprise_shp, output_mask):
     if spatial_ref is None:
         raise ValueError("Erreur : Impossible d'obtenir la projection depuis emprise_etude.shp.")
     
+    # ✅ Ouvrir Formation_vegetale (seules les partitions utiles d'un stock) et filtrer
+    ensure_spatial_index(formation_path)
+    xmin, xmax, ymin, ymax = emprise_layer.GetExtent()
+    formation_ds = open_shapefile(formation_path, extent=(xmin, ymin, xmax, ymax), extent_srs=spatial_ref)
+    formation_layer = formation_ds.GetLayer()
+    formation_layer = filter_forest_layer(
+        formation_layer, excluded_classes, included_classes,
+        spatial_filter=get_layer_geometry(emprise_layer)
+    )
+    
+    rasterize_forest_mask(formation_layer, emprise_layer, output_mask)
+
+def rasterize_forest_mask(formation_layer, emprise_layer, output_mask):
+    """
+    Rasterise une couche forêt déjà filtrée sur la grille de l'emprise.
+    """
+    spatial_ref = emprise_layer.GetSpatialRef()
+    tracer = get_tracer()
+
     # ✅ Créer un raster vide
     out_raster = create_raster_from_shapefile(output_mask, emprise_layer, spatial_ref)
     
     # ✅ Rasteriser la couche filtrée
-    rasterize_layer(out_raster, formation_layer)
+    with tracer.stage('rasterize_layer', pixels=out_raster.RasterXSize * out_raster.RasterYSize):
+        rasterize_layer(out_raster, formation_layer, callback=tracer.progress('rasterize_layer'))
     
     print(f"✅ Masque forêt créé : {output_mask}")
 
@@ -41,7 +69,11 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 formation_shp = os.path.join(BASE_DIR, "data", "project", "FORMATION_VEGETALE.shp")
 emprise_shp = os.path.join(BASE_DIR, "data", "project", "emprise_etude.shp")
 output_mask = os.path.join(BASE_DIR, "results", "data", "img_pretraitees", "masque_foret.tif")
+repaired_gpkg = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_repaired.gpkg")
+store_dir = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_store")
 
 # ✅ Appel de la fonction
 if __name__ == "__main__":
-    build_forest_mask(formation_shp, emprise_shp, output_mask)
+    # Le stock partitionné est utilisé s'il a été créé par ingest_bd_foret.py
+    formation_source = store_dir if os.path.isdir(store_dir) else formation_shp
+    build_forest_mask(formation_source, emprise_shp, output_mask, repaired_gpkg)
@@ -0,0 +1,20 @@
+import os
+import argparse
+from my_function import export_forest_pixels, PIXEL_ENCODINGS
+
+# ✅ Chemins des fichiers
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+input_mask = os.path.join(BASE_DIR, "results", "data", "img_pretraitees", "masque_foret.tif")
+output_prefix = os.path.join(BASE_DIR, "results", "data", "img_pretraitees", "pixels_foret")
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporte les pixels forêt du masque sous forme compacte triée.")
+    parser.add_argument("--mask", default=input_mask, help="Masque forêt (GeoTIFF)")
+    parser.add_argument("--output", default=output_prefix, help="Préfixe des fichiers de sortie")
+    parser.add_argument("--encoding", choices=PIXEL_ENCODINGS, default="linear",
+                        help="Indices linéaires ou plages par ligne")
+    parser.add_argument("--block-rows", type=int, default=256, help="Hauteur des bandes lues")
+    args = parser.parse_args()
+
+    export_forest_pixels(args.mask, args.output, args.encoding, args.block_rows)
@@ -0,0 +1,194 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from osgeo import gdal, gdal_array
+from my_function import (
+    validate_and_create_directory,
+    open_shapefile,
+    iter_windows,
+    prefetch,
+    raster_window_reader,
+    rasterize_polygon_ids
+)
+
+# ✅ Chemins des fichiers
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sample_shp = os.path.join(BASE_DIR, "results", "data", "sample", "Sample_BD_foret_T31TCJ.shp")
+emprise_shp = os.path.join(BASE_DIR, "data", "project", "emprise_etude.shp")
+output_dir = os.path.join(BASE_DIR, "results", "data", "training")
+
+# Taille visée d'une bande de lignes (toutes les images), en Mo
+STRIP_MB = 64
+# Nombre de bandes lues à l'avance pendant le traitement de la bande courante
+PREFETCH_DEPTH = 2
+
+
+def _open_aligned(paths, reference):
+    """
+    Ouvre les images et vérifie qu'elles partagent la grille du raster de référence.
+    """
+    datasets = []
+    for path in paths:
+        ds = gdal.Open(path)
+        if ds is None:
+            raise FileNotFoundError(f"Erreur : Impossible d'ouvrir l'image {path}.")
+        if (ds.RasterXSize, ds.RasterYSize) != (reference.RasterXSize, reference.RasterYSize) \
+                or not np.allclose(ds.GetGeoTransform(), reference.GetGeoTransform()):
+            raise ValueError(f"Erreur : {path} n'est pas alignée sur la grille du masque.")
+        datasets.append(ds)
+    return datasets
+
+
+def strip_rows(xsize, bytes_per_pixel, strip_mb=STRIP_MB):
+    """
+    Hauteur (en lignes) d'une bande pleine largeur d'environ strip_mb Mo.
+    """
+    return max(1, int(strip_mb * 1024 * 1024 // (xsize * bytes_per_pixel)))
+
+
+def _count_sample_pixels(id_raster, windows, depth):
+    read_ids = raster_window_reader(id_raster)
+    return sum(int(np.count_nonzero(ids)) for _, ids in prefetch(windows, read_ids, depth))
+
+
+def extract_training_matrix(id_raster, image_paths, labels_by_id, output_dir,
+                            block_rows=None, prefetch_depth=PREFETCH_DEPTH, strip_mb=STRIP_MB):
+    """
+    Lit les images par bandes de lignes alignées sur la grille du raster
+    d'identifiants et écrit, en .npy mappés en mémoire : X (pixels × variables),
+    labels, poly_ids et coords (x, y des centres de pixels).
+    Les prefetch_depth bandes suivantes sont lues en arrière-plan pendant la copie
+    de la courante : environ (prefetch_depth + 1) × strip_mb Mo sont en mémoire.
+    block_rows fixe la hauteur des bandes au lieu de la déduire de strip_mb.
+    """
+    validate_and_create_directory(output_dir)
+    id_ds = gdal.Open(id_raster)
+    if id_ds is None:
+        raise FileNotFoundError(f"Erreur : Impossible d'ouvrir le raster {id_raster}.")
+    images = _open_aligned(image_paths, id_ds)
+    n_features = sum(ds.RasterCount for ds in images)
+    dtype = np.result_type(*[
+        gdal_array.GDALTypeCodeToNumericTypeCode(ds.GetRasterBand(1).DataType) for ds in images
+    ])
+
+    xsize, ysize = id_ds.RasterXSize, id_ds.RasterYSize
+    if block_rows is None:
+        bytes_per_pixel = np.dtype(np.uint32).itemsize + sum(
+            ds.RasterCount * gdal.GetDataTypeSize(ds.GetRasterBand(1).DataType) // 8 for ds in images
+        )
+        block_rows = strip_rows(xsize, bytes_per_pixel, strip_mb)
+    windows = list(iter_windows(xsize, ysize, xsize, block_rows))
+    n_pixels = _count_sample_pixels(id_raster, windows, prefetch_depth)
+
+    # Tableaux de sortie mappés en mémoire (lecture zero-copy à l'entraînement)
+    open_npy = np.lib.format.open_memmap
+    X = open_npy(os.path.join(output_dir, 'X.npy'), mode='w+', dtype=dtype, shape=(n_pixels, n_features))
+    labels = open_npy(os.path.join(output_dir, 'labels.npy'), mode='w+', dtype=np.int16, shape=(n_pixels,))
+    poly_ids = open_npy(os.path.join(output_dir, 'poly_ids.npy'), mode='w+', dtype=np.uint32, shape=(n_pixels,))
+    coords = open_npy(os.path.join(output_dir, 'coords.npy'), mode='w+', dtype=np.float64, shape=(n_pixels, 2))
+
+    # Table de correspondance identifiant -> classe (-1 si inconnue)
+    label_lookup = np.full(max(labels_by_id, default=0) + 1, -1, dtype=np.int16)
+    for poly_id, label in labels_by_id.items():
+        label_lookup[poly_id] = label
+
+    # Lecture d'une bande : identifiants, puis images seulement si elle contient des pixels
+    read_ids = raster_window_reader(id_raster)
+    read_images = [raster_window_reader(path) for path in image_paths]
+    band_counts = [ds.RasterCount for ds in images]
+
+    def read_window(window):
+        ids = read_ids(window)
+        if not ids.any():
+            return ids, None
+        return ids, [read(window) for read in read_images]
+
+    x0, dx, _, y0, _, dy = id_ds.GetGeoTransform()
+    position = 0
+    for (xoff, yoff, width, height), (ids, blocks) in prefetch(windows, read_window, prefetch_depth):
+        if blocks is None:
+            continue
+        rows, cols = np.nonzero(ids)
+        end = position + rows.size
+
+        column = 0
+        for block, count in zip(blocks, band_counts):
+            block = block.reshape(count, height, width)
+            X[position:end, column:column + count] = block[:, rows, cols].T
+            column += count
+
+        sample_ids = ids[rows, cols]
+        poly_ids[position:end] = sample_ids
+        labels[position:end] = label_lookup[sample_ids]
+        coords[position:end, 0] = x0 + (xoff + cols + 0.5) * dx
+        coords[position:end, 1] = y0 + (yoff + rows + 0.5) * dy
+        position = end
+
+    for array in (X, labels, poly_ids, coords):
+        array.flush()
+
+    with open(os.path.join(output_dir, 'metadata.json'), 'w') as f:
+        json.dump({
+            'id_raster': os.path.abspath(id_raster),
+            'images': [os.path.abspath(path) for path in image_paths],
+            'n_pixels': n_pixels,
+            'n_features': n_features,
+            'geotransform': id_ds.GetGeoTransform(),
+            'projection': id_ds.GetProjection(),
+        }, f, indent=2)
+
+    print(f"✅ Matrice d'apprentissage écrite : {n_pixels} pixels × {n_features} variables dans {output_dir}")
+    return n_pixels
+
+
+def prepare_sample_ids(gdf, label_field='Code_Pixel'):
+    """
+    Ajoute un identifiant POLY_ID (1..n) à l'échantillon et renvoie la table identifiant -> classe.
+    """
+    gdf = gdf.reset_index(drop=True)
+    gdf['POLY_ID'] = np.arange(1, len(gdf) + 1, dtype=np.uint32)
+    codes = pd.to_numeric(gdf[label_field], errors='coerce').fillna(-1).astype(np.int16)
+    return gdf, dict(zip(gdf['POLY_ID'].tolist(), codes.tolist()))
+
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrait les pixels des polygones échantillonnés en matrice .npy.")
+    parser.add_argument("images", nargs="+", help="Images Sentinel-2 alignées sur la grille du masque")
+    parser.add_argument("--sample", default=sample_shp, help="Échantillon curé (shapefile)")
+    parser.add_argument("--emprise", default=emprise_shp, help="Emprise définissant la grille")
+    parser.add_argument("--label-field", default="Code_Pixel", help="Champ de classe")
+    parser.add_argument("--output-dir", default=output_dir, help="Dossier des tableaux .npy")
+    parser.add_argument("--id-raster", default=None,
+                        help="Raster d'identifiants existant (sinon rasterisé depuis l'échantillon)")
+    parser.add_argument("--keep-id-raster", action="store_true", help="Conserver le raster des identifiants")
+    parser.add_argument("--strip-mb", type=float, default=STRIP_MB,
+                        help="Taille visée d'une bande de lignes, toutes images confondues (Mo)")
+    parser.add_argument("--block-rows", type=int, default=None,
+                        help="Hauteur fixe des bandes de lignes (remplace --strip-mb)")
+    parser.add_argument("--prefetch-depth", type=int, default=PREFETCH_DEPTH,
+                        help="Nombre de bandes lues à l'avance (0 = lecture synchrone)")
+    args = parser.parse_args()
+
+    # Les identifiants suivent l'ordre des polygones de l'échantillon
+    sample, labels_by_id = prepare_sample_ids(gpd.read_file(args.sample), args.label_field)
+    id_raster = args.id_raster
+    if id_raster is None:
+        if args.keep_id_raster:
+            validate_and_create_directory(args.output_dir)
+            id_raster = os.path.join(args.output_dir, 'poly_ids.tif')
+        else:
+            id_raster = '/vsimem/poly_ids.tif'
+        emprise_ds = open_shapefile(args.emprise)
+        rasterize_polygon_ids(sample, emprise_ds.GetLayer(), id_raster)
+    try:
+        extract_training_matrix(
+            id_raster, args.images, labels_by_id, args.output_dir,
+            args.block_rows, args.prefetch_depth, args.strip_mb
+        )
+    finally:
+        if id_raster.startswith('/vsimem/'):
+            gdal.Unlink(id_raster)
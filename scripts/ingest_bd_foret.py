@@ -0,0 +1,21 @@
+import os
+import argparse
+from my_function import ensure_repaired_layer, ingest_partitioned_store
+
+# ✅ Chemins des fichiers
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+formation_shp = os.path.join(BASE_DIR, "data", "project", "FORMATION_VEGETALE.shp")
+repaired_gpkg = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_repaired.gpkg")
+store_dir = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_store")
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convertit la BD Forêt en stock partitionné sur une grille.")
+    parser.add_argument("--source", default=formation_shp, help="Shapefile BD Forêt source")
+    parser.add_argument("--output", default=store_dir, help="Dossier du stock partitionné")
+    parser.add_argument("--partition-size", type=float, default=20000, help="Taille des cases de la grille en mètres")
+    parser.add_argument("--no-repair", action="store_true", help="Ne pas passer par la couche réparée")
+    args = parser.parse_args()
+
+    source = args.source if args.no_repair else ensure_repaired_layer(args.source, repaired_gpkg)
+    ingest_partitioned_store(source, args.output, args.partition_size)
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import socket
+import cProfile
+import resource
+import threading
+from contextlib import contextmanager
+from osgeo import gdal
+
+# Variables d'environnement activant la trace sans modifier le code
+TRACE_ENV = 'TD3_TRACE'
+PROFILE_ENV = 'TD3_PROFILE_DIR'
+
+
+def peak_rss_mb():
+    """
+    Mémoire résidente de pointe du processus, en Mo.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb():
+    """
+    Mémoire résidente courante du processus, en Mo (None sans /proc).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return None
+
+
+class Tracer:
+    """
+    Écrit une trace JSONL par étape (temps réel, temps CPU, mémoire, cache de
+    blocs GDAL, compteurs) et, en option, un profil cProfile par étape.
+    La trace et les profils s'activent indépendamment l'un de l'autre.
+
+    Seuls wall_s et thread_cpu_s (thread de l'étape, hors threads de travail et
+    threads GDAL) sont propres à l'étape. process_cpu_s, rss_delta_mb et
+    process_peak_rss_mb sont des mesures du processus : elles incluent les
+    étapes listées dans concurrent_stages, exécutées en même temps.
+    """
+
+    def __init__(self, trace_path=None, profile_dir=None):
+        self.trace_path = trace_path
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Étapes en cours : clé -> (nom, thread, étapes d'autres threads l'ayant chevauchée)
+        self._active = {}
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.trace_path is not None
+
+    def event(self, kind, **fields):
+        """
+        Ajoute un événement à la trace JSONL.
+        """
+        if not self.enabled:
+            return
+        record = {'event': kind, 'time': time.time(), 'host': socket.gethostname(),
+                  'pid': os.getpid(), 'thread': threading.current_thread().name, **fields}
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock, open(self.trace_path, 'a') as f:
+            f.write(line)
+
+    @contextmanager
+    def stage(self, name, **counts):
+        """
+        Mesure une étape ; les compteurs (entités, pixels...) peuvent être
+        complétés dans le dictionnaire renvoyé.
+        """
+        record = dict(counts)
+        if not self.enabled and not self.profile_dir:
+            yield record
+            return
+
+        key, thread = object(), threading.get_ident()
+        with self._lock:
+            others = [(other, overlaps) for other, owner, overlaps in self._active.values() if owner != thread]
+            for _, overlaps in others:
+                overlaps.add(name)
+            self._active[key] = (name, thread, {other for other, _ in others})
+        profiler = self._start_profiler()
+        cache_before = gdal.GetCacheUsed()
+        rss_before = current_rss_mb()
+        wall_start, thread_start, cpu_start = time.perf_counter(), time.thread_time(), time.process_time()
+        status = 'ok'
+        try:
+            yield record
+        except BaseException as error:
+            status = f"error: {error!r}"
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            thread_cpu, cpu = time.thread_time() - thread_start, time.process_time() - cpu_start
+            rss_after = current_rss_mb()
+            profile_path = self._stop_profiler(profiler, name)
+            with self._lock:
+                concurrent = sorted(self._active.pop(key)[2])
+            self.event(
+                'stage', stage=name, status=status,
+                wall_s=wall, thread_cpu_s=thread_cpu, process_cpu_s=cpu,
+                rss_delta_mb=None if rss_before is None else rss_after - rss_before,
+                process_peak_rss_mb=peak_rss_mb(), concurrent_stages=concurrent,
+                gdal_cache_used_before=cache_before,
+                gdal_cache_used_after=gdal.GetCacheUsed(),
+                gdal_cache_max=gdal.GetCacheMax(),
+                profile=profile_path, **record
+            )
+
+    def progress(self, name, step=0.05):
+        """
+        Renvoie un callback de progression au format GDAL (complete, message, data)
+        qui trace l'avancement par paliers de step.
+        """
+        state = {'next': 0.0}
+
+        def callback(complete, message=None, data=None):
+            if complete >= state['next'] or complete >= 1.0:
+                self.event('progress', stage=name, complete=round(float(complete), 4), message=message or None)
+                state['next'] = complete + step
+            return 1
+
+        return callback
+
+    def _start_profiler(self):
+        # Un seul profil actif par thread : les étapes imbriquées sont incluses dans l'étape englobante
+        if not self.profile_dir or getattr(self._local, 'profiling', False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        self._local.profiling = True
+        return profiler
+
+    def _stop_profiler(self, profiler, name):
+        if profiler is None:
+            return None
+        profiler.disable()
+        self._local.profiling = False
+        path = os.path.join(self.profile_dir, f"{name}_{os.getpid()}_{int(time.time() * 1000)}.prof")
+        profiler.dump_stats(path)
+        return path
+
+
+_TRACER = None
+
+
+def get_tracer():
+    """
+    Renvoie le traceur du processus, configuré par TD3_TRACE / TD3_PROFILE_DIR.
+    """
+    global _TRACER
+    if _TRACER is None:
+        _TRACER = Tracer(os.environ.get(TRACE_ENV), os.environ.get(PROFILE_ENV))
+    return _TRACER
+
+
+def set_tracer(tracer):
+    """
+    Remplace le traceur du processus (ex. trace demandée en ligne de commande).
+    """
+    global _TRACER
+    _TRACER = tracer
+    return tracer
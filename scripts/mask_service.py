@@ -0,0 +1,226 @@
+import os
+import math
+import json
+import uuid
+import argparse
+import traceback
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import geopandas as gpd
+import shapely
+from osgeo import gdal
+from my_function import (
+    read_partitioned_store,
+    load_repaired_layer,
+    open_shapefile,
+    write_vsimem_layer,
+    get_execution_profile,
+    EXCLUDED_FOREST_CLASSES
+)
+from sample_curation import curate_sample
+
+# ✅ Chemins des fichiers
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+formation_shp = os.path.join(BASE_DIR, "data", "project", "FORMATION_VEGETALE.shp")
+repaired_gpkg = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_repaired.gpkg")
+store_dir = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_store")
+
+# Taille maximale d'un masque renvoyé (une tuile Sentinel-2 à 10 m)
+MAX_MASK_PIXELS = 10980 * 10980
+
+
+def _read_vsimem(path):
+    """
+    Lit le contenu complet d'un fichier /vsimem/.
+    """
+    size = gdal.VSIStatL(path).size
+    f = gdal.VSIFOpenL(path, 'rb')
+    try:
+        return bytes(gdal.VSIFReadL(1, size, f))
+    finally:
+        gdal.VSIFCloseL(f)
+
+
+class ForestIndex:
+    """
+    BD Forêt chargée et indexée une seule fois, qui répond aux demandes de
+    masque (GeoTIFF) et d'échantillon curé (Arrow) sur une emprise, avec un
+    cache LRU des dernières emprises.
+    """
+
+    def __init__(self, gdf, cache_size=64, max_pixels=MAX_MASK_PIXELS):
+        self.gdf = gdf
+        self.max_pixels = max_pixels
+        self.forest = gdf[~gdf['TFV'].isin(EXCLUDED_FOREST_CLASSES)].reset_index(drop=True)
+        self.gdf.sindex
+        self.forest.sindex
+        self.mask = lru_cache(maxsize=cache_size)(self._mask)
+        self.sample = lru_cache(maxsize=cache_size)(self._sample)
+        print(f"✅ BD Forêt indexée : {len(gdf)} polygones ({len(self.forest)} forestiers).")
+
+    @staticmethod
+    def snap(bounds, resolution):
+        """
+        Aligne une emprise sur la grille de résolution donnée (cellules entières).
+        """
+        xmin, ymin, xmax, ymax = bounds
+        return (
+            math.floor(xmin / resolution) * resolution, math.floor(ymin / resolution) * resolution,
+            math.ceil(xmax / resolution) * resolution, math.ceil(ymax / resolution) * resolution,
+        )
+
+    def mask_size(self, bounds, resolution):
+        """
+        Dimensions (colonnes, lignes) du masque d'une emprise déjà alignée ;
+        ValueError si elles dépassent max_pixels.
+        """
+        xmin, ymin, xmax, ymax = bounds
+        width, height = int(round((xmax - xmin) / resolution)), int(round((ymax - ymin) / resolution))
+        if width * height > self.max_pixels:
+            raise ValueError(
+                f"Masque de {width} × {height} pixels : au plus {self.max_pixels} pixels par requête."
+            )
+        return width, height
+
+    def _mask(self, bounds, resolution):
+        xmin, ymin, xmax, ymax = bounds
+        subset = self.forest.iloc[self.forest.sindex.query(shapely.box(*bounds), predicate='intersects')]
+
+        width, height = self.mask_size(bounds, resolution)
+        raster = gdal.GetDriverByName('MEM').Create('', width, height, 1, gdal.GDT_Byte)
+        if raster is None:
+            raise MemoryError(f"Erreur : Impossible de créer un masque de {width} × {height} pixels.")
+        raster.SetProjection(self.gdf.crs.to_wkt())
+        raster.SetGeoTransform((xmin, resolution, 0, ymax, 0, -resolution))
+        raster.GetRasterBand(1).SetNoDataValue(0)
+
+        if len(subset):
+            layer_path = write_vsimem_layer(subset[[subset.geometry.name]], 'forest')
+            try:
+                layer_ds = open_shapefile(layer_path)
+                gdal.RasterizeLayer(
+                    raster, [1], layer_ds.GetLayer(), burn_values=[1],
+                    options=get_execution_profile().rasterize_options
+                )
+                layer_ds = None
+            finally:
+                gdal.Unlink(layer_path)
+
+        tif_path = f"/vsimem/mask_{uuid.uuid4().hex}.tif"
+        try:
+            gdal.GetDriverByName('GTiff').CreateCopy(
+                tif_path, raster, options=get_execution_profile().creation_options()
+            )
+            return _read_vsimem(tif_path)
+        finally:
+            gdal.Unlink(tif_path)
+
+    def _sample(self, bounds):
+        import pyarrow as pa
+
+        extent = gpd.GeoDataFrame(geometry=[shapely.box(*bounds)], crs=self.gdf.crs)
+        subset = self.gdf.iloc[self.gdf.sindex.query(extent.geometry.iloc[0], predicate='intersects')]
+        sample = curate_sample(subset, extent)
+        sample = sample.astype({column: str for column in ('Code_Pixel', 'Code_Objet')})
+
+        table = pa.table(sample.to_arrow(geometry_encoding='WKB'))
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def make_handler(index):
+    """
+    Construit le gestionnaire HTTP : /mask et /sample (paramètre bbox=xmin,ymin,xmax,ymax).
+    """
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._send(status, json.dumps({'error': message}).encode(), 'application/json')
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == '/health':
+                return self._send(200, b'{"status": "ok"}', 'application/json')
+            if url.path not in ('/mask', '/sample'):
+                return self._error(404, f"Ressource inconnue : {url.path}")
+            try:
+                bounds = tuple(float(v) for v in query['bbox'][0].split(','))
+                if len(bounds) != 4 or not all(map(math.isfinite, bounds)) \
+                        or bounds[0] >= bounds[2] or bounds[1] >= bounds[3]:
+                    raise ValueError
+            except (KeyError, ValueError):
+                return self._error(400, "Paramètre bbox=xmin,ymin,xmax,ymax attendu.")
+
+            try:
+                if url.path == '/mask':
+                    try:
+                        resolution = float(query.get('resolution', ['10'])[0])
+                        if not math.isfinite(resolution) or resolution <= 0:
+                            raise ValueError
+                    except ValueError:
+                        return self._error(400, "Paramètre resolution (> 0, en mètres) attendu.")
+                    bounds = ForestIndex.snap(bounds, resolution)
+                    try:
+                        index.mask_size(bounds, resolution)
+                    except ValueError as error:
+                        return self._error(400, str(error))
+                    body, content_type = index.mask(bounds, resolution), 'image/tiff'
+                else:
+                    try:
+                        body = index.sample(bounds)
+                    except ImportError:
+                        return self._error(501, "pyarrow est nécessaire pour renvoyer l'échantillon.")
+                    content_type = 'application/vnd.apache.arrow.stream'
+            except Exception as error:
+                traceback.print_exc()
+                return self._error(500, f"Erreur interne : {error}")
+            return self._send(200, body, content_type)
+
+        def log_message(self, format, *args):
+            print(f"🌐 {self.address_string()} {format % args}")
+
+    return Handler
+
+
+def load_index(source, cache_size, max_pixels=MAX_MASK_PIXELS):
+    """
+    Charge la BD Forêt depuis le stock partitionné ou la couche réparée.
+    """
+    if os.path.isdir(source):
+        gdf = read_partitioned_store(source)
+    else:
+        gdf = load_repaired_layer(source, repaired_gpkg)
+    return ForestIndex(gdf, cache_size, max_pixels)
+
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service local de masques forêt et d'échantillons curés.")
+    parser.add_argument("--source", default=None,
+                        help="Stock partitionné ou shapefile BD Forêt (par défaut : stock s'il existe)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=64, help="Nombre d'emprises gardées en cache")
+    parser.add_argument("--max-pixels", type=int, default=MAX_MASK_PIXELS,
+                        help="Nombre maximal de pixels d'un masque renvoyé")
+    args = parser.parse_args()
+
+    source = args.source or (store_dir if os.path.isdir(store_dir) else formation_shp)
+    index = load_index(source, args.cache_size, args.max_pixels)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+    print(f"🚀 Service à l'écoute sur http://{args.host}:{args.port} (/mask, /sample)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -4,37 +4,188 @@ import matplotlib.pyplot as plt
 import plotly.express as px
 import pandas as pd
 
+# profil d'exécution GDAL
+
+from dataclasses import dataclass, field, fields
+
+@dataclass
+class ExecutionProfile:
+    """
+    Réglages GDAL d'une exécution : cache de blocs, threads, options de
+    création GTiff et options de rasterisation.
+    """
+    cache_max_mb: int = 512
+    num_threads: str = 'ALL_CPUS'
+    compress: str = 'DEFLATE'
+    predictor: int = 2
+    block_size: int = 512
+    bigtiff: str = 'IF_SAFER'
+    rasterize_options: list = field(default_factory=list)
+
+    # Variables d'environnement reconnues (préfixe TD3_GDAL_)
+    ENV_PREFIX = 'TD3_GDAL_'
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """
+        Construit un profil depuis TD3_GDAL_CACHE_MAX_MB, TD3_GDAL_NUM_THREADS,
+        TD3_GDAL_COMPRESS, ... (TD3_GDAL_RASTERIZE_OPTIONS séparées par des virgules).
+        """
+        environ = os.environ if environ is None else environ
+        values = {}
+        for item in fields(cls):
+            raw = environ.get(cls.ENV_PREFIX + item.name.upper())
+            if raw is None:
+                continue
+            if item.name == 'rasterize_options':
+                values[item.name] = [option for option in raw.split(',') if option]
+            elif item.name in ('cache_max_mb', 'predictor', 'block_size'):
+                values[item.name] = int(raw)
+            else:
+                values[item.name] = raw
+        return cls(**values)
+
+    def apply(self):
+        """
+        Applique le cache de blocs et le nombre de threads à GDAL pour le processus.
+        """
+        gdal.SetCacheMax(self.cache_max_mb * 1024 * 1024)
+        gdal.SetConfigOption('GDAL_NUM_THREADS', str(self.num_threads))
+        return self
+
+    def creation_options(self):
+        """
+        Options de création GTiff correspondant au profil.
+        """
+        options = [f"BIGTIFF={self.bigtiff}", f"NUM_THREADS={self.num_threads}"]
+        if self.compress and self.compress.upper() != 'NONE':
+            options += [f"COMPRESS={self.compress}", f"PREDICTOR={self.predictor}"]
+        if self.block_size:
+            options += ['TILED=YES', f"BLOCKXSIZE={self.block_size}", f"BLOCKYSIZE={self.block_size}"]
+        return options
+
+_EXECUTION_PROFILE = None
+
+def get_execution_profile():
+    """
+    Renvoie le profil d'exécution du processus (lu depuis l'environnement et
+    appliqué à la première utilisation).
+    """
+    global _EXECUTION_PROFILE
+    if _EXECUTION_PROFILE is None:
+        _EXECUTION_PROFILE = ExecutionProfile.from_env().apply()
+    return _EXECUTION_PROFILE
+
+def set_execution_profile(profile):
+    """
+    Remplace et applique le profil d'exécution du processus.
+    """
+    global _EXECUTION_PROFILE
+    _EXECUTION_PROFILE = profile.apply()
+    return profile
+
 def validate_and_create_directory(path):
     """
     Valide et crée un répertoire s'il n'existe pas.
+    Les chemins GDAL en mémoire (/vsimem/) n'ont pas besoin de dossier.
     """
+    if path.startswith('/vsimem'):
+        return
     if not os.path.exists(path):
         os.makedirs(path)
         print(f"📂 Dossier créé : {path}")
 
-def open_shapefile(shapefile_path):
+def open_shapefile(shapefile_path, extent=None, extent_srs=None):
     """
     Ouvre un fichier shapefile avec OGR.
+    Si le chemin est un stock partitionné (voir ingest_partitioned_store), seules
+    les partitions intersectant extent (xmin, ymin, xmax, ymax) sont ouvertes ;
+    extent_srs (osr.SpatialReference) est le système de coordonnées de extent.
     """
+    if os.path.isfile(os.path.join(shapefile_path, STORE_INDEX_NAME)):
+        return open_partitioned_store(shapefile_path, extent, extent_srs)
     ds = ogr.Open(shapefile_path)
     if ds is None:
         raise FileNotFoundError(f"Erreur : Impossible d'ouvrir le fichier {shapefile_path}.")
     return ds
 
-def filter_forest_layer(layer):
+# Classes non forestières exclues par défaut du masque
+EXCLUDED_FOREST_CLASSES = [
+    'Formation herbacée', 'Lande', 'Forêt fermée sans couvert arboré', 
+    'Forêt ouverte sans couvert arboré'
+]
+
+def _sql_list(values):
+    """
+    Formate une liste de valeurs texte pour une clause SQL IN (...).
+    """
+    return ", ".join("'" + str(value).replace("'", "''") + "'" for value in values)
+
+def filter_forest_layer(layer, excluded_classes=None, included_classes=None, spatial_filter=None, class_field='TFV'):
     """
     Applique un filtre pour exclure certaines classes non forestières.
+    included_classes restreint en plus la couche à ces classes ; spatial_filter
+    (géométrie OGR ou emprise (xmin, ymin, xmax, ymax)) limite la lecture aux
+    entités de la zone d'étude, ce que GDAL résout avec l'index spatial.
     """
-    excluded_classes = [
-        'Formation herbacée', 'Lande', 'Forêt fermée sans couvert arboré', 
-        'Forêt ouverte sans couvert arboré'
-    ]
-    layer.SetAttributeFilter(
-        "TFV NOT IN ('" + "', '".join(excluded_classes) + "')"
-    )
+    if excluded_classes is None:
+        excluded_classes = EXCLUDED_FOREST_CLASSES
+
+    clauses = []
+    if excluded_classes:
+        clauses.append(f"{class_field} NOT IN ({_sql_list(excluded_classes)})")
+    if included_classes:
+        clauses.append(f"{class_field} IN ({_sql_list(included_classes)})")
+    layer.SetAttributeFilter(" AND ".join(clauses) if clauses else None)
+
+    if isinstance(spatial_filter, ogr.Geometry):
+        geom = spatial_filter
+        layer_srs = layer.GetSpatialRef()
+        if geom.GetSpatialReference() is not None and layer_srs is not None \
+                and not geom.GetSpatialReference().IsSame(layer_srs):
+            geom = geom.Clone()
+            geom.TransformTo(layer_srs)
+        layer.SetSpatialFilter(geom)
+    elif spatial_filter is not None:
+        layer.SetSpatialFilterRect(*spatial_filter)
     return layer
 
-def create_raster_from_shapefile(output_path, emprise_layer, spatial_ref, resolution=10):
+def get_layer_geometry(layer):
+    """
+    Renvoie l'union des géométries d'une couche (ex. emprise d'étude), avec sa projection.
+    """
+    union = ogr.Geometry(ogr.wkbMultiPolygon)
+    layer.ResetReading()
+    for feature in layer:
+        geom = feature.GetGeometryRef()
+        if geom is not None:
+            union = union.Union(geom)
+    layer.ResetReading()
+    union.AssignSpatialReference(layer.GetSpatialRef())
+    return union
+
+def ensure_spatial_index(shapefile_path):
+    """
+    Crée l'index spatial (.qix) d'un shapefile s'il n'en a pas (.qix ou .sbn).
+    Sans droit d'écriture, la lecture se fera sans index.
+    """
+    base, extension = os.path.splitext(shapefile_path)
+    if extension.lower() != '.shp':
+        return False
+    if os.path.exists(base + '.qix') or os.path.exists(base + '.sbn'):
+        return True
+
+    ds = ogr.Open(shapefile_path, 1) if os.access(os.path.dirname(os.path.abspath(shapefile_path)), os.W_OK) else None
+    if ds is None:
+        print(f"⚠️ Index spatial impossible à créer pour {shapefile_path} (lecture seule).")
+        return False
+    layer_name = ds.GetLayer().GetName()
+    ds.ExecuteSQL(f'CREATE SPATIAL INDEX ON "{layer_name}"')
+    ds = None
+    print(f"🗂️ Index spatial créé : {base}.qix")
+    return True
+
+def create_raster_from_shapefile(output_path, emprise_layer, spatial_ref, resolution=10, data_type=gdal.GDT_Byte):
     """
     Crée un raster vide basé sur une emprise shapefile.
     """
@@ -46,7 +197,8 @@ def create_raster_from_shapefile(output_path, emprise_layer, spatial_ref, resolu
     out_raster = driver.Create(
         output_path,
         x_res, y_res,
-        1, gdal.GDT_Byte
+        1, data_type,
+        options=get_execution_profile().creation_options()
     )
     
     if out_raster is None:
@@ -60,15 +212,18 @@ def create_raster_from_shapefile(output_path, emprise_layer, spatial_ref, resolu
     
     return out_raster
 
-def rasterize_layer(raster, layer):
+def rasterize_layer(raster, layer, callback=None):
     """
     Rasterise une couche vectorielle dans un raster.
+    callback reçoit la progression GDAL (complete, message, data).
     """
     gdal.RasterizeLayer(
         raster,
         [1],  # Bande 1
         layer,
-        burn_values=[1]
+        burn_values=[1],
+        options=get_execution_profile().rasterize_options,
+        callback=callback
     )
     band = raster.GetRasterBand(1)
     band.SetNoDataValue(0)
@@ -79,12 +234,40 @@ def rasterize_layer(raster, layer):
 # sample curation
 
 import geopandas as gpd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
-def clip_to_extent(gdf, extent_gdf):
+def clip_to_extent(gdf, extent_gdf, n_workers=1, chunk_size=None, callback=None):
     """
     Découpe un GeoDataFrame avec une emprise spécifiée.
+
+    Avec n_workers > 1, le découpage est réparti par blocs de géométries sur un
+    pool de threads : les opérations vectorisées de shapely 2 libèrent le GIL,
+    ce qui permet d'utiliser tous les cœurs sans sérialiser les géométries.
+    En série comme en parallèle, le résultat est celui de gpd.clip(..., sort=True) :
+    mêmes lignes, dans l'ordre source, quel que soit n_workers.
+    callback reçoit la progression au format GDAL (complete, message, data).
     """
-    return gdf.clip(extent_gdf)
+    if n_workers is None or n_workers <= 1 or len(gdf) == 0:
+        clipped = gpd.clip(gdf, extent_gdf, sort=True)
+        if callback is not None:
+            callback(1.0, 'clip', None)
+        return clipped
+
+    if chunk_size is None:
+        # Plusieurs blocs par thread pour équilibrer la charge
+        chunk_size = max(1, int(np.ceil(len(gdf) / (n_workers * 4))))
+    chunks = [gdf.iloc[i:i + chunk_size] for i in range(0, len(gdf), chunk_size)]
+
+    clipped = []
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(gpd.clip, chunk, extent_gdf, sort=True) for chunk in chunks]
+        for i, future in enumerate(futures, start=1):
+            clipped.append(future.result())
+            if callback is not None:
+                callback(i / len(futures), 'clip', None)
+
+    return pd.concat(clipped)
 
 def filter_classes(gdf):
     """
@@ -123,6 +306,556 @@ def save_vector_file(gdf, output_path):
     gdf.to_file(output_path, driver='ESRI Shapefile')
     print(f"💾 Fichier sauvegardé : {output_path}")
 
+# réparation des géométries
+
+import hashlib
+import json
+import shapely
+
+SHAPEFILE_SIDECARS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+def compute_source_fingerprint(source_path, **params):
+    """
+    Calcule une empreinte de la couche source (taille et date de modification
+    de chaque fichier du shapefile) et des paramètres de réparation.
+    """
+    base, _ = os.path.splitext(source_path)
+    candidates = [base + ext for ext in SHAPEFILE_SIDECARS] if source_path.lower().endswith('.shp') else [source_path]
+    digest = hashlib.sha256()
+    for path in candidates:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def _polygonal_part(geom):
+    """
+    Conserve uniquement la partie surfacique d'une géométrie réparée.
+    """
+    if geom.geom_type in ('Polygon', 'MultiPolygon'):
+        return geom
+    polygons = [
+        part for part in shapely.get_parts(geom)
+        if part.geom_type in ('Polygon', 'MultiPolygon')
+    ]
+    return shapely.union_all(polygons) if polygons else shapely.Polygon()
+
+def repair_geometries(gdf, normalize=False, simplify_tolerance=None, resolution=10):
+    """
+    Répare les géométries invalides (make_valid) et, en option, les normalise
+    et les simplifie avec une tolérance inférieure au demi-pixel.
+    """
+    if simplify_tolerance is not None and simplify_tolerance >= resolution / 2:
+        raise ValueError(
+            f"Erreur : la tolérance de simplification ({simplify_tolerance} m) doit être "
+            f"inférieure au demi-pixel ({resolution / 2} m)."
+        )
+
+    gdf = gdf[gdf.geometry.notna()].copy()
+    invalid = ~gdf.geometry.is_valid
+    if invalid.any():
+        repaired = gdf.geometry[invalid].make_valid()
+        gdf.loc[invalid, gdf.geometry.name] = repaired.apply(_polygonal_part)
+        print(f"🛠️ {int(invalid.sum())} géométries invalides réparées.")
+
+    if simplify_tolerance:
+        gdf[gdf.geometry.name] = gdf.geometry.simplify(simplify_tolerance, preserve_topology=True)
+    if normalize:
+        gdf[gdf.geometry.name] = gdf.geometry.normalize()
+
+    return gdf[~gdf.geometry.is_empty]
+
+def ensure_repaired_layer(source_path, cache_path, normalize=False, simplify_tolerance=None, resolution=10):
+    """
+    Produit (si nécessaire) la couche réparée en GeoPackage et renvoie son chemin.
+    La couche n'est recalculée que si l'empreinte de la source a changé.
+    """
+    fingerprint = compute_source_fingerprint(
+        source_path, normalize=normalize,
+        simplify_tolerance=simplify_tolerance, resolution=resolution
+    )
+    fingerprint_path = cache_path + '.fingerprint.json'
+
+    if os.path.exists(cache_path) and os.path.exists(fingerprint_path):
+        with open(fingerprint_path) as f:
+            if json.load(f).get('fingerprint') == fingerprint:
+                print(f"♻️ Couche réparée à jour : {cache_path}")
+                return cache_path
+
+    validate_and_create_directory(os.path.dirname(cache_path) or '.')
+    gdf = gpd.read_file(source_path)
+    gdf = repair_geometries(gdf, normalize, simplify_tolerance, resolution)
+    gdf.to_file(cache_path, driver='GPKG')
+    with open(fingerprint_path, 'w') as f:
+        json.dump({'source': os.path.abspath(source_path), 'fingerprint': fingerprint}, f, indent=2)
+
+    print(f"💾 Couche réparée sauvegardée : {cache_path}")
+    return cache_path
+
+def load_repaired_layer(source_path, cache_path, normalize=False, simplify_tolerance=None, resolution=10):
+    """
+    Charge la couche réparée en GeoDataFrame, en la reconstruisant si besoin.
+    """
+    return gpd.read_file(ensure_repaired_layer(
+        source_path, cache_path, normalize, simplify_tolerance, resolution
+    ))
+
+# stockage partitionné
+
+import uuid
+
+STORE_INDEX_NAME = 'index.json'
+STORE_LAYER_NAME = 'formation_vegetale'
+
+def ingest_partitioned_store(source_path, store_dir, partition_size=20000):
+    """
+    Convertit une couche vectorielle en stock partitionné sur une grille :
+    un GeoPackage (avec index spatial) par case, et un index.json contenant
+    l'emprise et le nombre d'entités de chaque partition.
+    """
+    validate_and_create_directory(store_dir)
+    gdf = gpd.read_file(source_path)
+
+    # Sans géométrie, une entité n'a pas d'emprise et ne peut être rangée
+    missing = gdf.geometry.isna() | gdf.geometry.is_empty
+    if missing.any():
+        gdf = gdf[~missing]
+        print(f"⚠️ {int(missing.sum())} entités sans géométrie ignorées.")
+
+    # Chaque entité est rangée dans la case contenant le centre de son emprise
+    bounds = gdf.geometry.bounds
+    ix = np.floor((bounds['minx'] + bounds['maxx']) / 2 / partition_size).astype(int)
+    iy = np.floor((bounds['miny'] + bounds['maxy']) / 2 / partition_size).astype(int)
+
+    partitions = []
+    for (cell_x, cell_y), part in gdf.groupby([ix, iy], sort=True):
+        file_name = f"part_{cell_x}_{cell_y}.gpkg"
+        part.to_file(os.path.join(store_dir, file_name), layer=STORE_LAYER_NAME, driver='GPKG')
+        partitions.append({
+            'path': file_name,
+            'bounds': [float(v) for v in part.total_bounds],
+            'count': int(len(part)),
+        })
+
+    index = {
+        'source': os.path.abspath(source_path),
+        'fingerprint': compute_source_fingerprint(source_path, partition_size=partition_size),
+        'crs': gdf.crs.to_wkt() if gdf.crs is not None else None,
+        'partition_size': partition_size,
+        'partitions': partitions,
+    }
+    with open(os.path.join(store_dir, STORE_INDEX_NAME), 'w') as f:
+        json.dump(index, f, indent=2)
+
+    print(f"💾 Stock partitionné créé : {store_dir} ({len(partitions)} partitions, {len(gdf)} entités)")
+    return store_dir
+
+def load_store_index(store_dir):
+    """
+    Lit l'index d'un stock partitionné.
+    """
+    with open(os.path.join(store_dir, STORE_INDEX_NAME)) as f:
+        return json.load(f)
+
+def _bounds_intersect(a, b):
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+def select_partitions(store_dir, extent=None):
+    """
+    Renvoie les chemins des partitions dont l'emprise intersecte extent
+    (xmin, ymin, xmax, ymax), ou toutes les partitions si extent est None.
+    """
+    index = load_store_index(store_dir)
+    return [
+        os.path.join(store_dir, part['path'])
+        for part in index['partitions']
+        if extent is None or _bounds_intersect(part['bounds'], extent)
+    ]
+
+def read_partitioned_store(store_dir, bbox=None):
+    """
+    Charge en GeoDataFrame les entités d'un stock partitionné intersectant bbox.
+    bbox est un tuple (xmin, ymin, xmax, ymax) dans le CRS du stock, ou un
+    GeoDataFrame/GeoSeries (reprojeté si besoin).
+    """
+    index = load_store_index(store_dir)
+    if isinstance(bbox, (gpd.GeoDataFrame, gpd.GeoSeries)):
+        if index['crs'] is not None and bbox.crs is not None:
+            bbox = bbox.to_crs(index['crs'])
+        bbox = tuple(bbox.total_bounds)
+
+    paths = select_partitions(store_dir, bbox)
+    if not paths:
+        return gpd.GeoDataFrame(geometry=[], crs=index['crs'])
+    return pd.concat(
+        [gpd.read_file(path, layer=STORE_LAYER_NAME, bbox=bbox) for path in paths],
+        ignore_index=True
+    )
+
+def _extent_to_store_crs(store_dir, extent, extent_srs):
+    """
+    Reprojette une emprise (xmin, ymin, xmax, ymax) exprimée dans extent_srs
+    vers le CRS du stock (bords densifiés avant transformation).
+    """
+    index = load_store_index(store_dir)
+    if extent is None or extent_srs is None or index['crs'] is None:
+        return extent
+    store_srs = osr.SpatialReference()
+    store_srs.ImportFromWkt(index['crs'])
+    if store_srs.IsSame(extent_srs):
+        return extent
+
+    source_srs = extent_srs.Clone()
+    for srs in (source_srs, store_srs):
+        srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    xmin, ymin, xmax, ymax = extent
+    box = ogr.CreateGeometryFromWkt(
+        f"POLYGON (({xmin} {ymin}, {xmax} {ymin}, {xmax} {ymax}, {xmin} {ymax}, {xmin} {ymin}))"
+    )
+    box.Segmentize(max(xmax - xmin, ymax - ymin) / 32 or 1)
+    box.AssignSpatialReference(source_srs)
+    box.TransformTo(store_srs)
+    xmin, xmax, ymin, ymax = box.GetEnvelope()
+    return xmin, ymin, xmax, ymax
+
+def open_partitioned_store(store_dir, extent=None, extent_srs=None):
+    """
+    Ouvre avec OGR les partitions intersectant extent sous la forme d'une seule
+    couche (VRT d'union passé directement à OGR), utilisable comme un shapefile.
+    extent est reprojeté dans le CRS du stock si extent_srs est fourni.
+    """
+    extent = _extent_to_store_crs(store_dir, extent, extent_srs)
+    paths = select_partitions(store_dir, extent)
+    if not paths:
+        # Aucune partition concernée : couche vide de même schéma
+        paths = select_partitions(store_dir)[:1]
+
+    sources = "".join(
+        f"<OGRVRTLayer name=\"p{i}\"><SrcDataSource>{os.path.abspath(path)}</SrcDataSource>"
+        f"<SrcLayer>{STORE_LAYER_NAME}</SrcLayer></OGRVRTLayer>"
+        for i, path in enumerate(paths)
+    )
+    ds = ogr.Open(
+        f"<OGRVRTDataSource><OGRVRTUnionLayer name=\"{STORE_LAYER_NAME}\">"
+        f"{sources}</OGRVRTUnionLayer></OGRVRTDataSource>"
+    )
+    if ds is None:
+        raise FileNotFoundError(f"Erreur : Impossible d'ouvrir le stock partitionné {store_dir}.")
+    if extent is not None and not select_partitions(store_dir, extent):
+        ds.GetLayer().SetSpatialFilterRect(*extent)
+    return ds
+
+# couches vectorielles en mémoire
+
+def write_vsimem_layer(gdf, name='layer'):
+    """
+    Écrit un GeoDataFrame dans un GeoPackage /vsimem/ lisible par OGR et
+    renvoie son chemin (à libérer avec gdal.Unlink).
+    """
+    path = f"/vsimem/{name}_{uuid.uuid4().hex}.gpkg"
+    gdf.to_file(path, layer=name, driver='GPKG')
+    return path
+
+# lecture par blocs
+
+import threading
+from collections import deque
+from itertools import islice
+
+def iter_windows(xsize, ysize, block_xsize, block_ysize):
+    """
+    Parcourt une grille par fenêtres (xoff, yoff, largeur, hauteur), ligne par ligne.
+    """
+    for yoff in range(0, ysize, block_ysize):
+        for xoff in range(0, xsize, block_xsize):
+            yield xoff, yoff, min(block_xsize, xsize - xoff), min(block_ysize, ysize - yoff)
+
+def window_bounds(geotransform, window):
+    """
+    Convertit une fenêtre pixel (xoff, yoff, largeur, hauteur) en emprise
+    (xmin, ymin, xmax, ymax) dans le système de coordonnées de la grille.
+    """
+    x0, dx, _, y0, _, dy = geotransform
+    xoff, yoff, width, height = window
+    xs = (x0 + xoff * dx, x0 + (xoff + width) * dx)
+    ys = (y0 + yoff * dy, y0 + (yoff + height) * dy)
+    return min(xs), min(ys), max(xs), max(ys)
+
+def prefetch(windows, read_fn, depth=2, n_threads=None):
+    """
+    Parcourt les fenêtres en lisant les depth suivantes sur des threads
+    d'arrière-plan pendant le traitement de la fenêtre courante.
+    Renvoie les couples (fenêtre, données) dans l'ordre des fenêtres.
+    Avec depth = 0, les fenêtres sont lues à la demande, sans thread.
+    """
+    if depth < 0:
+        raise ValueError(f"Erreur : la profondeur de lecture anticipée doit être positive ou nulle (reçu {depth}).")
+    if depth == 0:
+        for window in windows:
+            yield window, read_fn(window)
+        return
+
+    windows = iter(windows)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=n_threads or depth) as executor:
+        for window in islice(windows, depth):
+            pending.append((window, executor.submit(read_fn, window)))
+        while pending:
+            window, future = pending.popleft()
+            for next_window in islice(windows, 1):
+                pending.append((next_window, executor.submit(read_fn, next_window)))
+            yield window, future.result()
+
+def raster_window_reader(path, band_list=None):
+    """
+    Renvoie une fonction de lecture de fenêtres d'un raster utilisable depuis
+    plusieurs threads (un jeu de données GDAL ouvert par thread).
+    """
+    local = threading.local()
+    get_execution_profile()
+
+    def read(window):
+        ds = getattr(local, 'ds', None)
+        if ds is None:
+            ds = local.ds = gdal.Open(path)
+            if ds is None:
+                raise FileNotFoundError(f"Erreur : Impossible d'ouvrir le raster {path}.")
+        return ds.ReadAsArray(*window, band_list=band_list)
+
+    return read
+
+def vector_window_reader(path, geotransform, layer=None):
+    """
+    Renvoie une fonction lisant les entités vectorielles qui intersectent une
+    fenêtre pixel de la grille (lecture filtrée par emprise), à passer à prefetch.
+    """
+    def read(window):
+        return gpd.read_file(path, layer=layer, bbox=window_bounds(geotransform, window))
+
+    return read
+
+class WriteBehind:
+    """
+    Écrit les blocs terminés sur un thread dédié, avec au plus max_pending
+    écritures en attente ; close() attend la fin et relaie la première erreur.
+    """
+
+    def __init__(self, write_fn, max_pending=4):
+        self._write_fn = write_fn
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+
+    def submit(self, *args):
+        # Remonter au plus tôt une erreur d'écriture déjà survenue
+        for future in [f for f in self._futures if f.done()]:
+            self._futures.remove(future)
+            future.result()
+
+        self._slots.acquire()
+        future = self._executor.submit(self._write_fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def rasterize_polygon_ids(gdf, emprise_layer, output_path, id_field='POLY_ID', resolution=10):
+    """
+    Rasterise l'identifiant de chaque polygone (0 = hors échantillon) sur la
+    grille de create_raster_from_shapefile.
+    """
+    layer_path = write_vsimem_layer(gdf[[id_field, gdf.geometry.name]], 'polygons')
+    try:
+        polygons_ds = open_shapefile(layer_path)
+        raster = create_raster_from_shapefile(
+            output_path, emprise_layer, emprise_layer.GetSpatialRef(), resolution, gdal.GDT_UInt32
+        )
+        options = get_execution_profile().rasterize_options + [f"ATTRIBUTE={id_field}"]
+        gdal.RasterizeLayer(raster, [1], polygons_ds.GetLayer(), options=options)
+        raster.GetRasterBand(1).SetNoDataValue(0)
+        raster.FlushCache()
+        raster = polygons_ds = None
+    finally:
+        gdal.Unlink(layer_path)
+    print(f"✅ Raster des identifiants de polygones créé : {output_path}")
+    return output_path
+
+# validation croisée spatiale
+
+def assign_spatial_blocks(gdf, block_size=10000):
+    """
+    Attribue chaque polygone à une case de grille (indexation par grille sur
+    son point représentatif, en temps linéaire) et renvoie l'identifiant de case.
+    """
+    points = gdf.geometry.representative_point()
+    ix = np.floor(points.x.to_numpy() / block_size).astype(np.int64)
+    iy = np.floor(points.y.to_numpy() / block_size).astype(np.int64)
+    # Identifiant compact 0..n_cases-1 (factorisation par hachage, linéaire)
+    key = (ix - ix.min(initial=0)) * (int(iy.max(initial=0) - iy.min(initial=0)) + 1) + (iy - iy.min(initial=0))
+    block_ids, _ = pd.factorize(key)
+    return block_ids
+
+def spatial_block_folds(gdf, n_folds=5, block_size=10000, class_field='Code_Pixel', weight_field=None, seed=0):
+    """
+    Répartit des cases spatiales entières entre n_folds plis équilibrés par classe
+    (glouton : chaque case, de la plus grosse à la plus petite, va au pli le moins
+    rempli pour ses classes). Renvoie l'identifiant de pli (int8) de chaque polygone.
+    """
+    if n_folds < 2:
+        raise ValueError(f"Erreur : il faut au moins 2 plis (reçu {n_folds}).")
+    if n_folds > np.iinfo(np.int8).max:
+        raise ValueError(f"Erreur : {n_folds} plis dépassent la capacité de la colonne fold (int8).")
+
+    weights = np.ones(len(gdf)) if weight_field is None else gdf[weight_field].to_numpy(dtype=float)
+    invalid = ~np.isfinite(weights) | (weights < 0)
+    if invalid.any():
+        raise ValueError(
+            f"Erreur : {int(invalid.sum())} poids ({weight_field}) manquants, infinis ou négatifs."
+        )
+    block_ids = assign_spatial_blocks(gdf, block_size)
+    class_ids, class_codes = pd.factorize(gdf[class_field].astype(str))
+
+    # Effectifs (ou poids) par case et par classe
+    n_blocks = int(block_ids.max()) + 1 if len(gdf) else 0
+    counts = np.zeros((n_blocks, len(class_codes)))
+    np.add.at(counts, (block_ids, class_ids), weights)
+
+    target = counts.sum(axis=0) / n_folds
+    target[target == 0] = 1
+    fill = np.zeros((n_folds, len(class_codes)))
+    block_fold = np.empty(n_blocks, dtype=np.int8)
+
+    # Plus grosses cases d'abord, ordre aléatoire reproductible à taille égale
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(n_blocks), -counts.sum(axis=1)))
+    for block in order:
+        cost = (fill / target) @ counts[block]
+        # À coût égal, le pli le moins rempli toutes classes confondues
+        candidates = np.flatnonzero(np.isclose(cost, cost.min()))
+        fold = int(candidates[np.argmin(fill[candidates].sum(axis=1))])
+        block_fold[block] = fold
+        fill[fold] += counts[block]
+
+    return block_fold[block_ids]
+
+# export des pixels forêt
+
+PIXEL_ENCODINGS = ('linear', 'runs')
+
+def export_forest_pixels(mask_path, output_prefix, encoding='linear', block_rows=256, prefetch_depth=2):
+    """
+    Parcourt le masque par bandes de lignes et écrit les pixels forêt sous forme
+    compacte triée : indices linéaires ligne par ligne (int64, <prefix>.idx) ou
+    plages par ligne (ligne, colonne de début, longueur en int32, <prefix>.runs),
+    avec la géoréférence de la grille dans <prefix>.json.
+    """
+    if encoding not in PIXEL_ENCODINGS:
+        raise ValueError(f"Erreur : encodage inconnu {encoding} (attendu : {PIXEL_ENCODINGS}).")
+    mask_ds = gdal.Open(mask_path)
+    if mask_ds is None:
+        raise FileNotFoundError(f"Erreur : Impossible d'ouvrir le masque {mask_path}.")
+    xsize, ysize = mask_ds.RasterXSize, mask_ds.RasterYSize
+    validate_and_create_directory(os.path.dirname(output_prefix) or '.')
+
+    # Bandes pleine largeur : l'ordre de sortie est directement l'ordre ligne par ligne
+    windows = iter_windows(xsize, ysize, xsize, block_rows)
+    data_path = f"{output_prefix}.{'idx' if encoding == 'linear' else 'runs'}"
+    n_pixels = n_records = 0
+    # Lecture anticipée des bandes suivantes et écriture différée des enregistrements
+    with open(data_path, 'wb') as f, WriteBehind(lambda records: records.tofile(f)) as writer:
+        for (_, yoff, _, _), block in prefetch(windows, raster_window_reader(mask_path), prefetch_depth):
+            forest = block > 0
+            if encoding == 'linear':
+                rows, cols = np.nonzero(forest)
+                records = (rows.astype(np.int64) + yoff) * xsize + cols
+                n_pixels += records.size
+            else:
+                padded = np.pad(forest.astype(np.int8), ((0, 0), (1, 1)))
+                edges = np.diff(padded, axis=1)
+                run_rows, starts = np.nonzero(edges == 1)
+                _, ends = np.nonzero(edges == -1)
+                records = np.column_stack([run_rows + yoff, starts, ends - starts]).astype(np.int32)
+                n_pixels += int((ends - starts).sum())
+            writer.submit(records.astype(records.dtype.newbyteorder('<')))
+            n_records += len(records)
+
+    with open(f"{output_prefix}.json", 'w') as f:
+        json.dump({
+            # Un masque en mémoire (/vsimem/) n'existe plus après l'export
+            'mask': None if mask_path.startswith('/vsimem/') else os.path.abspath(mask_path),
+            'encoding': encoding,
+            'data': os.path.basename(data_path),
+            'xsize': xsize,
+            'ysize': ysize,
+            'geotransform': mask_ds.GetGeoTransform(),
+            'projection': mask_ds.GetProjection(),
+            'n_pixels': n_pixels,
+            'n_records': n_records,
+        }, f, indent=2)
+
+    print(f"✅ {n_pixels} pixels forêt exportés ({n_pixels / (xsize * ysize or 1):.1%} de la grille) : {data_path}")
+    return n_pixels
+
+def load_forest_pixels(output_prefix):
+    """
+    Renvoie les métadonnées d'un export et ses enregistrements mappés en mémoire.
+    """
+    with open(f"{output_prefix}.json") as f:
+        meta = json.load(f)
+    data_path = os.path.join(os.path.dirname(output_prefix), meta['data'])
+    if meta['encoding'] == 'linear':
+        records = np.memmap(data_path, dtype='<i8', mode='r') if meta['n_records'] else np.empty(0, '<i8')
+    else:
+        shape = (meta['n_records'], 3)
+        records = np.memmap(data_path, dtype='<i4', mode='r', shape=shape) if meta['n_records'] else np.empty(shape, '<i4')
+    return meta, records
+
+def iter_forest_pixels(output_prefix, chunk_size=1_000_000):
+    """
+    Parcourt les pixels forêt d'un export par paquets d'environ chunk_size
+    pixels et renvoie des couples (lignes, colonnes) dans l'ordre ligne par ligne.
+    """
+    meta, records = load_forest_pixels(output_prefix)
+    if meta['encoding'] == 'linear':
+        for start in range(0, len(records), chunk_size):
+            rows, cols = np.divmod(np.asarray(records[start:start + chunk_size]), meta['xsize'])
+            yield rows, cols
+        return
+
+    # Plages : regroupées pour totaliser environ chunk_size pixels par paquet
+    lengths = np.asarray(records[:, 2], dtype=np.int64)
+    ends = np.cumsum(lengths)
+    boundaries = np.searchsorted(ends, np.arange(chunk_size, ends[-1] if len(ends) else 0, chunk_size), side='right')
+    for first, last in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(records)]))):
+        if first == last:
+            continue
+        runs = np.asarray(records[first:last], dtype=np.int64)
+        run_lengths = runs[:, 2]
+        offsets = np.repeat(np.cumsum(run_lengths) - run_lengths, run_lengths)
+        rows = np.repeat(runs[:, 0], run_lengths)
+        cols = np.repeat(runs[:, 1], run_lengths) + np.arange(offsets.size) - offsets
+        yield rows, cols
+
+def pixels_to_coords(geotransform, rows, cols):
+    """
+    Convertit des indices (ligne, colonne) en coordonnées des centres de pixels.
+    """
+    x0, dx, rx, y0, ry, dy = geotransform
+    x = x0 + (cols + 0.5) * dx + (rows + 0.5) * rx
+    y = y0 + (cols + 0.5) * ry + (rows + 0.5) * dy
+    return x, y
+
  # une analyse des échantillons sélectionné
 
 
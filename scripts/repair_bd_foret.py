@@ -0,0 +1,21 @@
+import os
+import argparse
+from my_function import ensure_repaired_layer
+
+# ✅ Chemins des fichiers
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+formation_shp = os.path.join(BASE_DIR, "data", "project", "FORMATION_VEGETALE.shp")
+repaired_gpkg = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_repaired.gpkg")
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Répare une fois pour toutes les géométries de la BD Forêt.")
+    parser.add_argument("--source", default=formation_shp, help="Shapefile BD Forêt source")
+    parser.add_argument("--output", default=repaired_gpkg, help="GeoPackage réparé en sortie")
+    parser.add_argument("--normalize", action="store_true", help="Normalise les géométries")
+    parser.add_argument("--simplify", type=float, default=None,
+                        help="Tolérance de simplification en mètres (< demi-pixel)")
+    parser.add_argument("--resolution", type=float, default=10, help="Résolution de la grille en mètres")
+    args = parser.parse_args()
+
+    ensure_repaired_layer(args.source, args.output, args.normalize, args.simplify, args.resolution)
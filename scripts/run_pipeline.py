@@ -0,0 +1,329 @@
+import os
+import argparse
+import tomllib
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import geopandas as gpd
+from osgeo import gdal
+from my_function import (
+    validate_and_create_directory,
+    read_partitioned_store,
+    ensure_repaired_layer,
+    ExecutionProfile,
+    set_execution_profile,
+    export_forest_pixels
+)
+from build_mask import build_forest_mask
+from sample_curation import curate_sample
+from sample_analysis_nb_sample import add_nb_pix, prepare_analysis_sample, generate_figures
+from instrumentation import Tracer, get_tracer, set_tracer
+
+# ✅ Chemins des fichiers (valeurs par défaut, surchargées par la configuration)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+formation_shp = os.path.join(BASE_DIR, "data", "project", "FORMATION_VEGETALE.shp")
+emprise_shp = os.path.join(BASE_DIR, "data", "project", "emprise_etude.shp")
+repaired_gpkg = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_repaired.gpkg")
+store_dir = os.path.join(BASE_DIR, "results", "data", "cache", "FORMATION_VEGETALE_store")
+output_mask = os.path.join(BASE_DIR, "results", "data", "img_pretraitees", "masque_foret.tif")
+output_sample = os.path.join(BASE_DIR, "results", "data", "sample", "Sample_BD_foret_T31TCJ.shp")
+output_figures = os.path.join(BASE_DIR, "results", "figure")
+output_forest_pixels = os.path.join(BASE_DIR, "results", "data", "img_pretraitees", "pixels_foret")
+
+# Artefacts pouvant être persistés sur disque
+ARTIFACTS = ('mask', 'sample', 'nb_pix', 'figures', 'forest_pixels')
+# Artefact produit par chaque étape (None : étape utile seulement à ses descendantes)
+STAGE_ARTIFACTS = {
+    'repair': None,
+    'mask': 'mask',
+    'forest_pixels': 'forest_pixels',
+    'curation': 'sample',
+    'nb_pix': 'nb_pix',
+    'analysis': 'figures',
+}
+
+
+def _nb_pix_path(context):
+    base, extension = os.path.splitext(context['output_sample'])
+    return f"{base}_NB_PIX{extension}"
+
+
+def stage_repair(context):
+    """
+    Produit (si nécessaire) la couche réparée, une seule fois avant les étapes
+    qui la lisent en parallèle ; un stock partitionné est utilisé tel quel.
+    """
+    formation = context['formation']
+    if os.path.isdir(formation):
+        context['repaired'] = formation
+    else:
+        context['repaired'] = ensure_repaired_layer(formation, context['repaired_cache'])
+
+
+def stage_mask(context):
+    """
+    Construit le masque forêt, en mémoire (/vsimem/) sauf s'il doit être persisté.
+    """
+    if 'mask' in context['persist']:
+        mask_path = context['output_mask']
+    else:
+        mask_path = '/vsimem/masque_foret.tif'
+        context['vsimem'].append(mask_path)
+
+    build_forest_mask(context['repaired'], context['emprise'], mask_path)
+    context['mask'] = mask_path
+
+
+def stage_forest_pixels(context):
+    """
+    Exporte les pixels forêt du masque (en mémoire ou relu sur disque) sous forme
+    compacte ; exécutée seulement si forest_pixels fait partie de persist.
+    """
+    mask_path = context.get('mask', context['output_mask'])
+    export_forest_pixels(mask_path, context['output_forest_pixels'], context['forest_pixels_encoding'])
+
+
+def stage_curation(context):
+    """
+    Produit l'échantillon curé, conservé en mémoire sauf s'il doit être persisté.
+    """
+    gdf_emprise = gpd.read_file(context['emprise'])
+    formation = context['repaired']
+    if os.path.isdir(formation):
+        gdf = read_partitioned_store(formation, bbox=gdf_emprise)
+    else:
+        gdf = gpd.read_file(formation)
+
+    sample = curate_sample(gdf, gdf_emprise, n_workers=context['n_workers'])
+    if 'sample' in context['persist']:
+        validate_and_create_directory(os.path.dirname(context['output_sample']))
+        sample.to_file(context['output_sample'], driver='ESRI Shapefile')
+        print(f"💾 Fichier sauvegardé : {context['output_sample']}")
+    context['sample'] = sample
+
+
+def stage_nb_pix(context):
+    """
+    Ajoute NB_PIX à l'échantillon (en mémoire, ou relu sur disque si la curation
+    ne fait pas partie de l'exécution).
+    """
+    if 'sample' in context:
+        sample = context['sample'].copy()
+    else:
+        sample = gpd.read_file(context['output_sample'])
+    sample = add_nb_pix(sample)
+    if 'nb_pix' in context['persist']:
+        output_path = _nb_pix_path(context)
+        validate_and_create_directory(os.path.dirname(output_path))
+        sample.to_file(output_path, driver='ESRI Shapefile')
+        print(f"💾 Fichier sauvegardé : {output_path}")
+    context['nb_pix'] = sample
+
+
+def stage_analysis(context):
+    """
+    Génère les graphiques d'analyse de l'échantillon.
+    """
+    if 'nb_pix' in context:
+        gdf = context['nb_pix']
+    elif os.path.exists(_nb_pix_path(context)):
+        gdf = gpd.read_file(_nb_pix_path(context))
+    else:
+        gdf = add_nb_pix(gpd.read_file(context['output_sample']))
+
+    gdf = prepare_analysis_sample(gdf)
+    if 'figures' in context['persist']:
+        validate_and_create_directory(context['output_figures'])
+        generate_figures(gdf, context['output_figures'], context['interactive'])
+
+
+# DAG des étapes : nom -> (fonction, dépendances)
+STAGES = {
+    'repair': (stage_repair, []),
+    'mask': (stage_mask, ['repair']),
+    'forest_pixels': (stage_forest_pixels, ['mask']),
+    'curation': (stage_curation, ['repair']),
+    'nb_pix': (stage_nb_pix, ['curation']),
+    'analysis': (stage_analysis, ['nb_pix']),
+}
+
+
+def load_config(config_path=None):
+    """
+    Construit la configuration d'exécution : valeurs par défaut, puis sections
+    [paths] et [run] du fichier TOML s'il est fourni ; la section [gdal]
+    décrit le profil d'exécution GDAL (voir ExecutionProfile).
+    """
+    config = {
+        'formation': store_dir if os.path.isdir(store_dir) else formation_shp,
+        'emprise': emprise_shp,
+        'repaired_cache': repaired_gpkg,
+        'output_mask': output_mask,
+        'output_sample': output_sample,
+        'output_figures': output_figures,
+        'output_forest_pixels': output_forest_pixels,
+        'forest_pixels_encoding': 'linear',
+        'persist': ['figures'],
+        'n_workers': os.cpu_count() or 1,
+        'jobs': 2,
+        'interactive': True,
+        'gdal': {},
+    }
+    if config_path is not None:
+        with open(config_path, 'rb') as f:
+            data = tomllib.load(f)
+        unknown = set(data) - {'paths', 'run', 'gdal'}
+        if unknown:
+            raise ValueError(f"Sections inconnues dans {config_path} : {sorted(unknown)}")
+        config.update(data.get('paths', {}))
+        config.update(data.get('run', {}))
+        config['gdal'] = data.get('gdal', {})
+    return config
+
+
+def select_stages(only=None, start=None):
+    """
+    Renvoie les étapes à exécuter : celles de only, ou start et toutes ses
+    descendantes, ou tout le DAG. La réparation, partagée par le masque et la
+    curation, est toujours ajoutée avant elles.
+    """
+    if only:
+        selected = set(only)
+    elif start:
+        selected = {start}
+        for name, (_, dependencies) in STAGES.items():
+            if selected.intersection(dependencies):
+                selected.add(name)
+    else:
+        selected = set(STAGES)
+    if any('repair' in STAGES[name][1] for name in selected):
+        selected.add('repair')
+    return [name for name in STAGES if name in selected]
+
+
+def _is_ready(name, selected, done):
+    # Une dépendance hors sélection est relue sur disque par l'étape elle-même
+    return all(dep in done or dep not in selected for dep in STAGES[name][1])
+
+
+def plan_waves(selected):
+    """
+    Regroupe les étapes sélectionnées en vagues exécutables en parallèle.
+    """
+    waves, done = [], set()
+    remaining = list(selected)
+    while remaining:
+        wave = [name for name in remaining if _is_ready(name, selected, done)]
+        waves.append(wave)
+        done.update(wave)
+        remaining = [name for name in remaining if name not in done]
+    return waves
+
+
+def prune_stages(selected, persist, requested=()):
+    """
+    Ne garde que les étapes dont l'artefact est persisté ou dont une étape
+    gardée dépend : rien n'est calculé pour être aussitôt jeté. Les étapes
+    de requested (demandées explicitement) sont toujours gardées.
+    """
+    kept = set(requested)
+    # STAGES est dans l'ordre topologique : les descendantes sont vues d'abord
+    for name in reversed(list(STAGES)):
+        if name not in selected:
+            continue
+        artifact = STAGE_ARTIFACTS[name]
+        if (artifact is not None and artifact in persist) \
+                or any(name in STAGES[other][1] for other in kept):
+            kept.add(name)
+    return [name for name in selected if name in kept]
+
+
+def run_pipeline(config, selected=None, dry_run=False, requested=()):
+    """
+    Exécute le DAG d'étapes : les étapes indépendantes (masque et curation) sont
+    lancées en même temps sur un pool de threads ; les intermédiaires restent en
+    mémoire et seuls les artefacts listés dans persist (et les étapes qui y
+    mènent) sont produits. Une étape de requested (ex. --only) est exécutée et
+    son artefact persisté même s'il ne figure pas dans persist.
+    """
+    persist = set(config['persist'])
+    for name in requested:
+        artifact = STAGE_ARTIFACTS[name]
+        if artifact is not None and artifact not in persist:
+            persist.add(artifact)
+            print(f"💾 Étape {name} demandée : l'artefact {artifact} sera persisté.")
+
+    selected = prune_stages(selected or select_stages(), persist, requested)
+    if dry_run:
+        for i, wave in enumerate(plan_waves(selected), start=1):
+            print(f"🧭 Vague {i} : {', '.join(wave)}")
+        print(f"💾 Artefacts persistés : {', '.join(sorted(persist)) or 'aucun'}")
+        return None
+
+    # La section [gdal] de la configuration prime sur l'environnement (TD3_GDAL_*)
+    if config['gdal']:
+        set_execution_profile(replace(ExecutionProfile.from_env(), **config['gdal']))
+
+    context = {**config, 'persist': persist, 'vsimem': []}
+    tracer = get_tracer()
+
+    def run_stage(name):
+        with tracer.stage(f"pipeline.{name}"):
+            STAGES[name][0](context)
+        return name
+
+    pending, done, running = list(selected), set(), {}
+    try:
+        with ThreadPoolExecutor(max_workers=config['jobs']) as executor:
+            while pending or running:
+                for name in [name for name in pending if _is_ready(name, selected, done)]:
+                    pending.remove(name)
+                    running[executor.submit(run_stage, name)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    running.pop(future)
+                    name = future.result()
+                    done.add(name)
+                    print(f"✅ Étape terminée : {name}")
+    finally:
+        for path in context['vsimem']:
+            gdal.Unlink(path)
+
+    print("🎯 Pipeline terminé.")
+    return context
+
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline masque / curation → NB_PIX → analyse.")
+    parser.add_argument("--config", default=None, help="Fichier de configuration TOML")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--only", nargs="+", choices=list(STAGES), help="Étapes à exécuter")
+    selection.add_argument("--from", dest="start", choices=list(STAGES),
+                           help="Exécuter à partir de cette étape (et ses descendantes)")
+    parser.add_argument("--dry-run", action="store_true", help="Afficher ce qui serait exécuté")
+    parser.add_argument("--persist", nargs="*", choices=ARTIFACTS, default=None,
+                        help="Artefacts à écrire sur disque (remplace la configuration)")
+    parser.add_argument("--jobs", type=int, default=None, help="Nombre d'étapes exécutées en parallèle")
+    parser.add_argument("--static", action="store_true", help="Graphiques statiques (Matplotlib)")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de threads pour le découpage")
+    parser.add_argument("--trace", default=None, help="Fichier de trace JSONL (sinon $TD3_TRACE)")
+    parser.add_argument("--profile-dir", default=None, help="Dossier des profils cProfile par étape (sinon $TD3_PROFILE_DIR)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.persist is not None:
+        config['persist'] = args.persist
+    if args.jobs is not None:
+        config['jobs'] = args.jobs
+    if args.workers is not None:
+        config['n_workers'] = args.workers
+    if args.static:
+        config['interactive'] = False
+
+    if args.trace or args.profile_dir:
+        tracer = get_tracer()
+        set_tracer(Tracer(args.trace or tracer.trace_path, args.profile_dir or tracer.profile_dir))
+
+    # Les étapes nommées sur la ligne de commande ne sont jamais ignorées
+    requested = args.only or ([args.start] if args.start else [])
+    run_pipeline(config, select_stages(args.only, args.start), args.dry_run, requested)
@@ -1,25 +1,20 @@
+import os
 import geopandas as gpd
-from my_function import filter_classes, clip_to_extent, save_vector_file
+from my_function import (
+    filter_classes, clip_to_extent, save_vector_file,
+    load_repaired_layer, read_partitioned_store
+)
+from instrumentation import get_tracer
 
 # Chemins des fichiers
 input_shapefile = '/home/onyxia/work/data/project/FORMATION_VEGETALE.shp'
 emprise_shapefile = '/home/onyxia/work/data/project/emprise_etude.shp'
 output_shapefile = '/home/onyxia/work/results/data/sample/Sample_BD_foret_T31TCJ.shp'
+repaired_gpkg = '/home/onyxia/work/results/data/cache/FORMATION_VEGETALE_repaired.gpkg'
+store_dir = '/home/onyxia/work/results/data/cache/FORMATION_VEGETALE_store'
 
-# Chargement des fichiers
-gdf = gpd.read_file(input_shapefile)
-gdf_emprise = gpd.read_file(emprise_shapefile)
-
-# Harmonisation des CRS
-if gdf.crs != gdf_emprise.crs:
-    gdf = gdf.to_crs(gdf_emprise.crs)
-
-# Filtrage par emprise
-gdf_filtered = gdf[gdf.intersects(gdf_emprise.union_all())].copy()
-
-# Étape 2 : Clipage précis avec gpd.clip
-gdf_clipped = gpd.clip(gdf_filtered, gdf_emprise)
-
+# Nombre de threads pour le découpage (1 = découpage séquentiel)
+n_workers = os.cpu_count() or 1
 
 # Mapping complet pour Classif Pixel
 mapping_pixel = {
@@ -132,32 +127,80 @@ mapping_objet = {
 }
 
 
-# Ajout des champs Pixel et Objet
-gdf_clipped['Code_Pixel'] = gdf_clipped['CODE_TFV'].apply(
-    lambda x: mapping_pixel.get(str(x), {}).get('Code_Pixel', 'Inconnu')
-)
-gdf_clipped['Nom_Pixel'] = gdf_clipped['CODE_TFV'].apply(
-    lambda x: mapping_pixel.get(str(x), {}).get('Nom_Pixel', 'Inconnu')
-)
-gdf_clipped['Code_Objet'] = gdf_clipped['CODE_TFV'].apply(
-    lambda x: mapping_objet.get(str(x), {}).get('Code_Objet', 'Inconnu')
-)
-gdf_clipped['Nom_Objet'] = gdf_clipped['CODE_TFV'].apply(
-    lambda x: mapping_objet.get(str(x), {}).get('Nom_Objet', 'Inconnu')
-)
+def add_class_fields(gdf):
+    """
+    Ajoute les champs Pixel et Objet à partir de CODE_TFV.
+    """
+    gdf['Code_Pixel'] = gdf['CODE_TFV'].apply(
+        lambda x: mapping_pixel.get(str(x), {}).get('Code_Pixel', 'Inconnu')
+    )
+    gdf['Nom_Pixel'] = gdf['CODE_TFV'].apply(
+        lambda x: mapping_pixel.get(str(x), {}).get('Nom_Pixel', 'Inconnu')
+    )
+    gdf['Code_Objet'] = gdf['CODE_TFV'].apply(
+        lambda x: mapping_objet.get(str(x), {}).get('Code_Objet', 'Inconnu')
+    )
+    gdf['Nom_Objet'] = gdf['CODE_TFV'].apply(
+        lambda x: mapping_objet.get(str(x), {}).get('Nom_Objet', 'Inconnu')
+    )
+    return gdf
+
+
+def curate_sample(gdf, gdf_emprise, n_workers=1):
+    """
+    Sélectionne et découpe les polygones sur l'emprise, puis ajoute les champs de classes.
+    """
+    tracer = get_tracer()
+
+    # Harmonisation des CRS
+    if gdf.crs != gdf_emprise.crs:
+        gdf = gdf.to_crs(gdf_emprise.crs)
+
+    # Filtrage par emprise
+    with tracer.stage('curation_intersect', features_in=len(gdf)) as record:
+        gdf_filtered = gdf[gdf.intersects(gdf_emprise.union_all())].copy()
+        record['features_out'] = len(gdf_filtered)
+
+    # Étape 2 : Clipage précis (parallélisé par blocs de géométries)
+    with tracer.stage('curation_clip', features_in=len(gdf_filtered), n_workers=n_workers) as record:
+        gdf_clipped = clip_to_extent(
+            gdf_filtered, gdf_emprise, n_workers=n_workers,
+            callback=tracer.progress('curation_clip')
+        )
+        record['features_out'] = len(gdf_clipped)
+
+    with tracer.stage('curation_mapping', features_in=len(gdf_clipped)):
+        return add_class_fields(gdf_clipped)
+
+
+def load_formation(gdf_emprise):
+    """
+    Charge la BD Forêt : seules les partitions du stock intersectant l'emprise
+    sont lues s'il existe, sinon la couche réparée (mise en cache) complète.
+    """
+    if os.path.isdir(store_dir):
+        return read_partitioned_store(store_dir, bbox=gdf_emprise)
+    return load_repaired_layer(input_shapefile, repaired_gpkg)
+
+
+if __name__ == "__main__":
+    # Chargement des fichiers
+    gdf_emprise = gpd.read_file(emprise_shapefile)
+    gdf = load_formation(gdf_emprise)
+
+    gdf_clipped = curate_sample(gdf, gdf_emprise, n_workers=n_workers)
 
-# Vérification des données après agrégation
-print("🔍 Aperçu des données après ajout des champs :")
-print(gdf_clipped[['CODE_TFV', 'TFV', 'Code_Pixel', 'Nom_Pixel', 'Code_Objet', 'Nom_Objet']].head())
+    # Vérification des données après agrégation
+    print("🔍 Aperçu des données après ajout des champs :")
+    print(gdf_clipped[['CODE_TFV', 'TFV', 'Code_Pixel', 'Nom_Pixel', 'Code_Objet', 'Nom_Objet']].head())
 
-# Vérification des valeurs uniques
-print("\n📊 Valeurs uniques pour Code_Pixel :", gdf_clipped['Code_Pixel'].unique())
-print("📊 Valeurs uniques pour Nom_Pixel :", gdf_clipped['Nom_Pixel'].unique())
-print("📊 Valeurs uniques pour Code_Objet :", gdf_clipped['Code_Objet'].unique())
-print("📊 Valeurs uniques pour Nom_Objet :", gdf_clipped['Nom_Objet'].unique())
+    # Vérification des valeurs uniques
+    print("\n📊 Valeurs uniques pour Code_Pixel :", gdf_clipped['Code_Pixel'].unique())
+    print("📊 Valeurs uniques pour Nom_Pixel :", gdf_clipped['Nom_Pixel'].unique())
+    print("📊 Valeurs uniques pour Code_Objet :", gdf_clipped['Code_Objet'].unique())
+    print("📊 Valeurs uniques pour Nom_Objet :", gdf_clipped['Nom_Objet'].unique())
 
-output_path = '/home/onyxia/work/results/data/sample/Sample_BD_foret_T31TCJ.shp'
-gdf_clipped.to_file(output_path, driver='ESRI Shapefile')
+    gdf_clipped.to_file(output_shapefile, driver='ESRI Shapefile')
 
-print(f"✅ Fichier sauvegardé avec succès : {output_path}")
-print(f"📊 Nombre de polygones sauvegardés : {len(gdf_clipped)}")
+    print(f"✅ Fichier sauvegardé avec succès : {output_shapefile}")
+    print(f"📊 Nombre de polygones sauvegardés : {len(gdf_clipped)}")
@@ -0,0 +1,32 @@
+import os
+import argparse
+import geopandas as gpd
+from my_function import spatial_block_folds, save_vector_file
+
+# ✅ Chemins des fichiers
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sample_shp = os.path.join(BASE_DIR, "results", "data", "sample", "Sample_BD_foret_T31TCJ.shp")
+output_shp = os.path.join(BASE_DIR, "results", "data", "sample", "Sample_BD_foret_T31TCJ_folds.shp")
+
+# ✅ Appel de la fonction
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validation croisée spatiale par cases sur l'échantillon curé.")
+    parser.add_argument("--sample", default=sample_shp, help="Échantillon curé")
+    parser.add_argument("--output", default=output_shp, help="Échantillon avec la colonne fold")
+    parser.add_argument("--folds", type=int, default=5, help="Nombre de plis")
+    parser.add_argument("--block-size", type=float, default=10000, help="Taille des cases en mètres")
+    parser.add_argument("--class-field", default="Code_Pixel", help="Champ de classe à équilibrer")
+    parser.add_argument("--weight-field", default=None, help="Champ de poids (ex. NB_PIX), sinon un par polygone")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    gdf = gpd.read_file(args.sample)
+    if not gdf.crs.is_projected:
+        raise ValueError("Le CRS doit être projeté (en mètres) pour découper en cases.")
+
+    gdf['fold'] = spatial_block_folds(
+        gdf, args.folds, args.block_size, args.class_field, args.weight_field, args.seed
+    )
+    print("📊 Polygones par pli :")
+    print(gdf.groupby('fold')[args.class_field].value_counts().unstack(fill_value=0))
+    save_vector_file(gdf, args.output)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les scripts s'importent depuis leur dossier (comme lorsqu'ils sont exécutés)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
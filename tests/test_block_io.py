@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+pytest.importorskip("osgeo")
+gpd = pytest.importorskip("geopandas")
+shapely = pytest.importorskip("shapely")
+
+from my_function import iter_windows, window_bounds, prefetch, vector_window_reader, WriteBehind
+
+# Grille de 10 × 10 pixels de 10 m, origine en haut à gauche (0, 100)
+GEOTRANSFORM = (0.0, 10.0, 0.0, 100.0, 0.0, -10.0)
+
+
+def test_iter_windows_covers_grid():
+    windows = list(iter_windows(10, 7, 4, 3))
+
+    assert windows[0] == (0, 0, 4, 3)
+    assert windows[-1] == (8, 6, 2, 1)
+    assert sum(w * h for _, _, w, h in windows) == 70
+
+
+def test_prefetch_keeps_window_order():
+    windows = list(iter_windows(5, 20, 5, 2))
+    result = list(prefetch(windows, lambda window: window[1], depth=3))
+
+    assert [window for window, _ in result] == windows
+    assert [data for _, data in result] == [window[1] for window in windows]
+
+
+def test_prefetch_depth_zero_reads_synchronously():
+    windows = list(iter_windows(5, 6, 5, 2))
+    threads = set()
+
+    def read(window):
+        threads.add(threading.get_ident())
+        return window
+
+    assert [data for _, data in prefetch(windows, read, depth=0)] == windows
+    assert threads == {threading.get_ident()}
+
+
+def test_prefetch_rejects_negative_depth():
+    with pytest.raises(ValueError, match="profondeur"):
+        list(prefetch([(0, 0, 1, 1)], lambda window: window, depth=-1))
+
+
+def test_window_bounds():
+    assert window_bounds(GEOTRANSFORM, (0, 0, 5, 5)) == (0.0, 50.0, 50.0, 100.0)
+    assert window_bounds(GEOTRANSFORM, (5, 5, 5, 5)) == (50.0, 0.0, 100.0, 50.0)
+
+
+def test_vector_reader_through_prefetch(tmp_path):
+    path = str(tmp_path / "polygons.gpkg")
+    gpd.GeoDataFrame(
+        {'name': ['haut_gauche', 'bas_droite']},
+        geometry=[shapely.box(10, 60, 20, 70), shapely.box(60, 10, 70, 20)],
+        crs="EPSG:2154"
+    ).to_file(path, driver='GPKG')
+
+    windows = list(iter_windows(10, 10, 5, 5))
+    result = list(prefetch(windows, vector_window_reader(path, GEOTRANSFORM), depth=2))
+
+    assert [window for window, _ in result] == windows
+    assert [list(gdf['name']) for _, gdf in result] == [['haut_gauche'], [], [], ['bas_droite']]
+
+
+def test_write_behind_writes_in_order_off_thread():
+    written, threads = [], set()
+
+    def write(value):
+        threads.add(threading.get_ident())
+        written.append(value)
+
+    with WriteBehind(write, max_pending=2) as writer:
+        for value in range(50):
+            writer.submit(value)
+
+    assert written == list(range(50))
+    assert threading.get_ident() not in threads
+
+
+def test_write_behind_reports_write_error():
+    def write(value):
+        if value == 3:
+            raise OSError("disque plein")
+
+    with pytest.raises(OSError, match="disque plein"):
+        with WriteBehind(write) as writer:
+            for value in range(10):
+                writer.submit(value)
@@ -0,0 +1,59 @@
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("osgeo")
+shapely = pytest.importorskip("shapely")
+
+from my_function import clip_to_extent
+
+
+def _grid(n=40, crs="EPSG:2154"):
+    # Carrés de 10 m alignés sur une ligne, avec un attribut d'ordre source
+    return gpd.GeoDataFrame(
+        {'rank': range(n)},
+        geometry=[shapely.box(i * 10, 0, i * 10 + 10, 10) for i in range(n)],
+        crs=crs,
+    )
+
+
+def _extent(xmin, xmax, crs="EPSG:2154"):
+    return gpd.GeoDataFrame(geometry=[shapely.box(xmin, -5, xmax, 5)], crs=crs)
+
+
+@pytest.mark.parametrize("n_workers, chunk_size", [(2, None), (4, 3), (3, 1)])
+def test_parallel_matches_sorted_clip(n_workers, chunk_size):
+    gdf, extent = _grid(), _extent(55, 255)
+    expected = gpd.clip(gdf, extent, sort=True)
+    result = clip_to_extent(gdf, extent, n_workers=n_workers, chunk_size=chunk_size)
+
+    assert list(result.index) == list(expected.index)
+    assert list(result['rank']) == list(expected['rank'])
+    assert result.geometry.geom_equals(expected.geometry).all()
+    assert result.crs == expected.crs
+
+
+def test_parallel_all_chunks_empty():
+    gdf, extent = _grid(), _extent(10_000, 10_100)
+    expected = gpd.clip(gdf, extent, sort=True)
+    result = clip_to_extent(gdf, extent, n_workers=4, chunk_size=5)
+
+    assert len(result) == len(expected) == 0
+    assert list(result.columns) == list(expected.columns)
+    assert result.crs == expected.crs
+
+
+def test_order_independent_of_workers():
+    gdf, extent = _grid(), _extent(55, 255)
+    serial = clip_to_extent(gdf, extent)
+    parallel = clip_to_extent(gdf, extent, n_workers=4, chunk_size=3)
+
+    assert list(serial.index) == list(parallel.index)
+    assert list(serial['rank']) == sorted(serial['rank'])
+
+
+def test_callback_reaches_completion():
+    gdf, extent = _grid(), _extent(55, 255)
+    progress = []
+    clip_to_extent(gdf, extent, n_workers=2, chunk_size=7, callback=lambda c, m, d: progress.append(c))
+
+    assert progress == sorted(progress) and progress[-1] == 1.0
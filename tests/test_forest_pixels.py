@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+gdal = pytest.importorskip("osgeo.gdal")
+pytest.importorskip("geopandas")
+
+from my_function import export_forest_pixels, load_forest_pixels, iter_forest_pixels, pixels_to_coords
+
+GEOTRANSFORM = (500000.0, 10.0, 0.0, 6300000.0, 0.0, -10.0)
+
+
+def _write_mask(path, array):
+    ds = gdal.GetDriverByName('GTiff').Create(str(path), array.shape[1], array.shape[0], 1, gdal.GDT_Byte)
+    ds.SetGeoTransform(GEOTRANSFORM)
+    ds.GetRasterBand(1).WriteArray(array)
+    ds = None
+    return str(path)
+
+
+def _random_mask(shape=(23, 17), seed=0):
+    # Plages de longueurs variées, y compris en bord de ligne
+    mask = (np.random.default_rng(seed).random(shape) > 0.55).astype(np.uint8)
+    mask[0, :] = 1
+    mask[-1, -3:] = 1
+    return mask
+
+
+@pytest.mark.parametrize("encoding", ["linear", "runs"])
+@pytest.mark.parametrize("chunk_size", [1, 7, 10_000])
+def test_roundtrip_matches_mask(tmp_path, encoding, chunk_size):
+    mask = _random_mask()
+    prefix = str(tmp_path / "pixels")
+    n_pixels = export_forest_pixels(_write_mask(tmp_path / "mask.tif", mask), prefix, encoding, block_rows=4)
+
+    chunks = list(iter_forest_pixels(prefix, chunk_size=chunk_size))
+    rows = np.concatenate([r for r, _ in chunks])
+    cols = np.concatenate([c for _, c in chunks])
+    expected_rows, expected_cols = np.nonzero(mask)
+
+    assert n_pixels == mask.sum()
+    assert (rows == expected_rows).all() and (cols == expected_cols).all()
+    if encoding == 'linear':
+        assert all(len(r) <= chunk_size for r, _ in chunks)
+
+
+def test_runs_are_per_row(tmp_path):
+    mask = np.array([[0, 1, 1, 0, 1], [1, 1, 1, 1, 1], [0, 0, 0, 0, 0]], dtype=np.uint8)
+    prefix = str(tmp_path / "pixels")
+    export_forest_pixels(_write_mask(tmp_path / "mask.tif", mask), prefix, 'runs', block_rows=1)
+
+    meta, records = load_forest_pixels(prefix)
+    assert records.tolist() == [[0, 1, 2], [0, 4, 1], [1, 0, 5]]
+    assert meta['n_pixels'] == 8 and meta['n_records'] == 3
+
+
+@pytest.mark.parametrize("encoding", ["linear", "runs"])
+def test_empty_mask(tmp_path, encoding):
+    prefix = str(tmp_path / "pixels")
+    export_forest_pixels(_write_mask(tmp_path / "mask.tif", np.zeros((5, 6), np.uint8)), prefix, encoding)
+
+    assert list(iter_forest_pixels(prefix)) == []
+
+
+def test_vsimem_mask_not_recorded(tmp_path):
+    mask_path = _write_mask('/vsimem/test_mask.tif', _random_mask())
+    try:
+        export_forest_pixels(mask_path, str(tmp_path / "pixels"))
+    finally:
+        gdal.Unlink(mask_path)
+
+    with open(tmp_path / "pixels.json") as f:
+        assert json.load(f)['mask'] is None
+
+
+def test_pixel_centres():
+    x, y = pixels_to_coords(GEOTRANSFORM, np.array([0, 2]), np.array([0, 3]))
+
+    assert x.tolist() == [500005.0, 500035.0]
+    assert y.tolist() == [6299995.0, 6299975.0]
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+osr = pytest.importorskip("osgeo.osr")
+shapely = pytest.importorskip("shapely")
+
+from my_function import (
+    ingest_partitioned_store,
+    load_store_index,
+    select_partitions,
+    open_partitioned_store,
+    _extent_to_store_crs
+)
+
+NEAR = shapely.box(650100, 6860100, 650200, 6860200)
+FAR = shapely.box(700100, 6900100, 700200, 6900200)
+
+
+@pytest.fixture
+def store(tmp_path):
+    source = gpd.GeoDataFrame(
+        {'TFV': ['Forêt fermée de hêtre pur', 'Lande', 'Forêt fermée de hêtre pur']},
+        geometry=[NEAR, FAR, None], crs="EPSG:2154"
+    )
+    source_path = str(tmp_path / "formation.gpkg")
+    source.to_file(source_path, driver='GPKG')
+    return ingest_partitioned_store(source_path, str(tmp_path / "store"), partition_size=1000)
+
+
+def _srs(epsg):
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(epsg)
+    return srs
+
+
+def test_ingest_skips_missing_geometries(store):
+    index = load_store_index(store)
+
+    assert len(index['partitions']) == 2
+    assert sum(part['count'] for part in index['partitions']) == 2
+
+
+def test_select_partitions_by_extent(store):
+    assert len(select_partitions(store)) == 2
+    selected = select_partitions(store, NEAR.bounds)
+    assert [os.path.basename(path) for path in selected] == ['part_650_6860.gpkg']
+    assert select_partitions(store, (0, 0, 10, 10)) == []
+
+
+def test_extent_reprojected_to_store_crs(store):
+    near_wgs84 = tuple(gpd.GeoSeries([NEAR], crs="EPSG:2154").to_crs("EPSG:4326").total_bounds)
+    extent = _extent_to_store_crs(store, near_wgs84, _srs(4326))
+
+    assert shapely.box(*extent).contains(NEAR.buffer(-1))
+    assert [os.path.basename(path) for path in select_partitions(store, extent)] == ['part_650_6860.gpkg']
+    # Même CRS : emprise inchangée
+    assert _extent_to_store_crs(store, NEAR.bounds, _srs(2154)) == NEAR.bounds
+
+
+def test_open_store_with_foreign_extent(store):
+    near_wgs84 = tuple(gpd.GeoSeries([NEAR], crs="EPSG:2154").to_crs("EPSG:4326").total_bounds)
+    ds = open_partitioned_store(store, near_wgs84, _srs(4326))
+
+    assert ds.GetLayer().GetFeatureCount() == 1
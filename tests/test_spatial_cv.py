@@ -0,0 +1,81 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("osgeo")
+shapely = pytest.importorskip("shapely")
+
+from my_function import assign_spatial_blocks, spatial_block_folds
+
+
+def _sample(n_blocks_x=8, n_blocks_y=5, per_block=6, block_size=1000):
+    # Plusieurs polygones par case, deux classes alternées
+    geoms, classes = [], []
+    for bx in range(n_blocks_x):
+        for by in range(n_blocks_y):
+            for i in range(per_block):
+                x, y = bx * block_size + 100 * i + 10, by * block_size + 10
+                geoms.append(shapely.box(x, y, x + 50, y + 50))
+                classes.append(str(11 + (bx + by + i) % 2))
+    return gpd.GeoDataFrame({'Code_Pixel': classes}, geometry=geoms, crs="EPSG:2154")
+
+
+def test_blocks_follow_grid():
+    gdf = _sample(3, 2, 4)
+    blocks = assign_spatial_blocks(gdf, block_size=1000)
+
+    assert len(set(blocks)) == 6
+    assert all(len(set(blocks[i:i + 4])) == 1 for i in range(0, len(gdf), 4))
+
+
+def test_blocks_never_split_across_folds():
+    gdf = _sample()
+    folds = spatial_block_folds(gdf, n_folds=4, block_size=1000)
+    blocks = assign_spatial_blocks(gdf, block_size=1000)
+
+    assert folds.dtype == np.int8
+    assert set(folds) == {0, 1, 2, 3}
+    for block in set(blocks):
+        assert len(set(folds[blocks == block])) == 1
+
+
+def test_folds_balanced_per_class():
+    gdf = _sample()
+    folds = spatial_block_folds(gdf, n_folds=4, block_size=1000)
+
+    for code in gdf['Code_Pixel'].unique():
+        per_fold = np.bincount(folds[(gdf['Code_Pixel'] == code).to_numpy()], minlength=4)
+        # 40 cases de 3 polygones par classe : au plus une case d'écart entre plis
+        assert per_fold.max() - per_fold.min() <= 3
+
+
+def test_weights_drive_balance():
+    gdf = _sample(4, 1, 1)
+    gdf['Code_Pixel'] = '11'
+    gdf['NB_PIX'] = [100, 1, 1, 1]
+    folds = spatial_block_folds(gdf, n_folds=2, block_size=1000, weight_field='NB_PIX')
+
+    # La case lourde reste seule dans son pli
+    assert (folds == folds[0]).sum() == 1
+
+
+def test_reproducible_with_seed():
+    gdf = _sample()
+    first = spatial_block_folds(gdf, n_folds=5, block_size=1000, seed=3)
+
+    assert (first == spatial_block_folds(gdf, n_folds=5, block_size=1000, seed=3)).all()
+
+
+@pytest.mark.parametrize("n_folds", [200, 1, 0, -1])
+def test_invalid_fold_count(n_folds):
+    with pytest.raises(ValueError, match="plis"):
+        spatial_block_folds(_sample(1, 1, 2), n_folds=n_folds)
+
+
+@pytest.mark.parametrize("bad_weight", [float('nan'), float('inf'), -1.0])
+def test_invalid_weights(bad_weight):
+    gdf = _sample(2, 1, 2)
+    gdf['NB_PIX'] = [1.0, bad_weight, 1.0, 1.0]
+
+    with pytest.raises(ValueError, match="poids"):
+        spatial_block_folds(gdf, n_folds=2, block_size=1000, weight_field='NB_PIX')